@@ -1,4 +1,15 @@
 import streamlit as st
+from status_agendador import resumo_status
+
+# ✅ Nova forma correta de ler query params
+params = st.query_params
+
+# Health check: responde antes de importar pandas/bcrypt/requests e de carregar o .env
+if "ping" in params:
+    st.write("✅ Jarvis Lembrete está online!")
+    st.json(resumo_status())
+    st.stop()
+
 import json
 import pandas as pd
 from datetime import datetime
@@ -12,15 +23,21 @@ import base64
 import requests
 import pytz
 import bcrypt
-import hashlib
 import subprocess
-
-# ✅ Nova forma correta de ler query params
-params = st.query_params
-
-if "ping" in params:
-    st.write("✅ Jarvis Lembrete está online!")
-    st.stop()
+import threading
+from contextlib import contextmanager
+from busca_lembretes import IndiceLembretes
+from canais_entrega import CanalWebhook
+from cache_avatares import obter_avatar
+from dados import (
+    VERSAO_ESQUEMA_ATUAL, ConflitoVersao, Transacao, atualizar_registro, carregar_json, incrementar_versao,
+    migrar_dados, remover_registros, salvar_json, versao_esquema, versao_registro
+)
+from estatisticas import (
+    ESTATISTICAS_AGENDADOR_FILE, ESTATISTICAS_FILE, FAIXAS_ATRASO, carregar_estatisticas, combinar_estatisticas,
+    completar_estatisticas, reconstruir_estatisticas,
+    registrar_criacao, registrar_remocao, registrar_transferencia, remover_usuario
+)
 
 
 # Carrega variáveis do .env
@@ -46,14 +63,35 @@ if 'logged_in' not in st.session_state:
     st.session_state.senha_inicial_pendente = False
 
 
-def salvar_com_commit_json(arquivo, dados, mensagem_commit):
-    """Salva dados em um arquivo JSON e faz um commit e push para o GitHub."""
+def salvar_varios_com_commit_json(arquivos_dados, mensagem_commit):
+    """Salva vários arquivos JSON ({arquivo: dados}) e faz um único commit e push para o GitHub."""
+    try:
+        # 1. Salva os arquivos localmente
+        for caminho, dados in arquivos_dados.items():
+            salvar_json(caminho, dados)
+        print(f"DEBUG: Arquivo(s) {', '.join(arquivos_dados)} salvo(s) localmente. Mensagem: {mensagem_commit}")
+    except Exception as e:
+        st.error(f"Erro inesperado ao salvar {', '.join(arquivos_dados)}: {e}")
+        print(f"DEBUG: Erro inesperado ao salvar arquivo: {e}")
+        return
+    commitar_arquivos_json(list(arquivos_dados), mensagem_commit)
+
+@contextmanager
+def transacao_com_commit(padroes, mensagem_commit):
+    """Transação (dados.Transacao) sobre os arquivos; o que mudou vai para o GitHub num único commit, já fora da trava.
+
+    Um ConflitoVersao levantado no bloco aborta a transação sem gravar nada e chega a quem chamou.
+    """
+    transacao = Transacao(padroes)
+    with transacao as dados:
+        yield dados
+    if transacao.alterados:
+        commitar_arquivos_json(transacao.alterados, mensagem_commit)
+
+def commitar_arquivos_json(arquivos, mensagem_commit):
+    """Faz commit e push para o GitHub de arquivos já gravados em disco."""
+    arquivo = ", ".join(arquivos)
     try:
-        # 1. Salva o arquivo localmente
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=4)
-        print(f"DEBUG: Arquivo {arquivo} salvo localmente. Mensagem: {mensagem_commit}")
-
         # 2. Configura as credenciais do Git usando o token do ambiente
         github_token = os.getenv("GITHUB_TOKEN")
         print(f"DEBUG: GITHUB_TOKEN obtido (não imprime o valor real, apenas se existe): {bool(github_token)}")
@@ -67,8 +105,8 @@ def salvar_com_commit_json(arquivo, dados, mensagem_commit):
         subprocess.run(["git", "config", "user.name", "Streamlit Cloud Bot"], check=True)
         subprocess.run(["git", "config", "user.email", "streamlit-bot@example.com"], check=True)
 
-        # 3. Adiciona o arquivo às mudanças do Git
-        subprocess.run(["git", "add", arquivo], check=True)
+        # 3. Adiciona os arquivos às mudanças do Git
+        subprocess.run(["git", "add", *arquivos], check=True)
         print(f"DEBUG: {arquivo} adicionado ao staging do Git.")
 
         # 4. Verifica se há algo para commitar antes de tentar commitar
@@ -143,88 +181,216 @@ def salvar_com_commit_json(arquivo, dados, mensagem_commit):
 
 def carregar_lembretes():
     try:
-        with open(LEMBRETES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return carregar_json(LEMBRETES_FILE)
     except (json.JSONDecodeError, FileNotFoundError):
         return []
 
-def salvar_lembretes(lembretes, mensagem_commit="Lembretes atualizados."):
-    salvar_com_commit_json(LEMBRETES_FILE, lembretes, mensagem_commit)
+def obter_estatisticas(lembretes=None):
+    """Contadores do painel admin (app + scheduler somados); se o arquivo do app ainda não existe, é montado a partir dos lembretes."""
+    agendador = carregar_estatisticas(ESTATISTICAS_AGENDADOR_FILE)
+    estatisticas = carregar_estatisticas()
+    if estatisticas is None:
+        estatisticas = reconstruir_estatisticas(lembretes if lembretes is not None else carregar_lembretes(), agendador)
+    return combinar_estatisticas(estatisticas, agendador)
+
+def estatisticas_da_transacao(dados):
+    """Contadores dentro de uma transação sobre LEMBRETES_FILE e ESTATISTICAS_FILE. Chamar antes de alterar os lembretes."""
+    estatisticas = completar_estatisticas(dados[ESTATISTICAS_FILE])
+    if estatisticas is None:
+        estatisticas = reconstruir_estatisticas(dados[LEMBRETES_FILE], carregar_estatisticas(ESTATISTICAS_AGENDADOR_FILE))
+    dados[ESTATISTICAS_FILE] = estatisticas
+    return estatisticas
+
+def deletar_lembretes(versoes_esperadas, mensagem_commit):
+    """Remove os lembretes {id: versão lida} numa única transação. Retorna (sucesso, mensagem)."""
+    try:
+        with transacao_com_commit({LEMBRETES_FILE: [], ESTATISTICAS_FILE: None}, mensagem_commit) as dados:
+            estatisticas = estatisticas_da_transacao(dados)
+            removidos = remover_registros(dados[LEMBRETES_FILE], versoes_esperadas)
+            for lembrete_removido in removidos:
+                registrar_remocao(estatisticas, lembrete_removido)
+    except ConflitoVersao as e:
+        return False, f"{e} Nenhum lembrete foi deletado; confira a lista atualizada e tente de novo."
+    indice_busca = obter_indice_busca()
+    for lembrete_id in versoes_esperadas:
+        indice_busca.remover(lembrete_id)
+    return True, f"{len(removidos)} lembrete(s) deletado(s) com sucesso!"
+
+def versoes_exibidas(chave, registros):
+    """{id: versão} dos registros como foram exibidos na renderização anterior desta sessão.
+
+    O clique num botão chega numa nova execução do script, que já relê os arquivos; a versão que vale
+    para o compare-and-swap é a que o usuário tinha na tela. As versões atuais ficam guardadas para o próximo clique.
+    """
+    anteriores = st.session_state.get(chave, {})
+    atuais = {registro.get('id'): versao_registro(registro) for registro in registros}
+    st.session_state[chave] = atuais
+    return {registro_id: anteriores.get(registro_id, versao) for registro_id, versao in atuais.items()}
+
+def hoje_str():
+    return datetime.now(FUSO_HORARIO_BRASIL).strftime('%Y-%m-%d')
+
+@st.cache_resource
+def obter_indice_busca():
+    """Índice de busca compartilhado entre as sessões; mantido incrementalmente, nunca reconstruído."""
+    return IndiceLembretes()
+
+def sincronizar_indice_busca(lembretes):
+    """Aplica ao índice as mudanças do lembretes.json feitas fora desta sessão (outras sessões, scheduler, git pull)."""
+    try:
+        versao = os.stat(LEMBRETES_FILE).st_mtime_ns
+    except OSError:
+        versao = None
+    indice = obter_indice_busca()
+    indice.sincronizar(lembretes, versao)
+    return indice
 
 def carregar_configuracoes():
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return carregar_json(CONFIG_FILE)
     except (json.JSONDecodeError, FileNotFoundError):
         return {}
 
-def salvar_configuracoes(configuracoes, mensagem_commit="Configurações atualizadas."):
-    salvar_com_commit_json(CONFIG_FILE, configuracoes, mensagem_commit)
+def atualizar_configuracoes_usuario(user_id, campos, mensagem_commit="Configurações atualizadas."):
+    """Altera só as configurações de `user_id` (campos com valor None são removidos), relidas sob a trava.
+
+    Retorna False, sem gravar nada, se o usuário foi removido por outra sessão.
+    """
+    with transacao_com_commit({USUARIOS_FILE: [], CONFIG_FILE: {}}, mensagem_commit) as dados:
+        if not any(u.get('id') == user_id for u in dados[USUARIOS_FILE]):
+            return False
+        config_usuario = dados[CONFIG_FILE].setdefault(user_id, {})
+        for campo, valor in campos.items():
+            if valor is None:
+                config_usuario.pop(campo, None)
+            else:
+                config_usuario[campo] = valor
+    return True
 
 def carregar_usuarios():
     try:
-        with open(USUARIOS_FILE, 'r', encoding='utf-8') as f:
-            usuarios = json.load(f)
-            # ADICIONADO PARA COMPATIBILIDADE RETROATIVA:
-            for user in usuarios:
-                if "senha_inicial_definida" not in user:
-                    user["senha_inicial_definida"] = True # Usuários existentes são considerados com senha inicial definida
-            return usuarios
+        # Usuários antigos sem 'senha_inicial_definida' são completados pela migração do esquema (dados.py)
+        return carregar_json(USUARIOS_FILE)
     except (json.JSONDecodeError, FileNotFoundError):
         return []
 
-def salvar_usuarios(usuarios, mensagem_commit="Usuários atualizados."):
-    salvar_com_commit_json(USUARIOS_FILE, usuarios, mensagem_commit)
-
 def adicionar_usuario(username, password, role):
-    usuarios = carregar_usuarios()
-    if any(u['username'] == username for u in usuarios):
-        return False, "Usuário já existe."
-
     hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     novo_usuario = {
         "id": str(uuid.uuid4()),
         "username": username,
         "password_hash": hashed_password,
         "role": role,
-        "senha_inicial_definida": False
+        "senha_inicial_definida": False,
+        "versao": 1
     }
-    usuarios.append(novo_usuario)
-    salvar_usuarios(usuarios, f"Adicionado novo usuário: {username}")
+    with transacao_com_commit({USUARIOS_FILE: []}, f"Adicionado novo usuário: {username}") as dados:
+        usuarios = dados[USUARIOS_FILE]
+        if any(u['username'] == username for u in usuarios):
+            return False, "Usuário já existe."
+        usuarios.append(novo_usuario)
     return True, "Usuário adicionado com sucesso."
 
-def editar_usuario(user_id, novo_username, nova_role=None, nova_senha=None):
-    usuarios = carregar_usuarios()
-    user_found = False
-    for i, user in enumerate(usuarios):
-        if user['id'] == user_id:
-            user_found = True
+def editar_usuario(user_id, novo_username, nova_role=None, nova_senha=None, versao_esperada=None):
+    """Edita o usuário se ele ainda estiver na `versao_esperada` (a exibida no formulário)."""
+    campos = {'username': novo_username}
+    if nova_role:
+        campos['role'] = nova_role
+    if nova_senha:
+        campos['password_hash'] = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    try:
+        with transacao_com_commit({USUARIOS_FILE: []}, f"Usuário {novo_username} editado.") as dados:
+            usuarios = dados[USUARIOS_FILE]
             if any(u['username'] == novo_username and u['id'] != user_id for u in usuarios):
                 return False, "Nome de usuário já existe."
-
-            usuarios[i]['username'] = novo_username
-            if nova_role:
-                usuarios[i]['role'] = nova_role
-            if nova_senha:
-                hashed_new_password = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                usuarios[i]['password_hash'] = hashed_new_password
-            salvar_usuarios(usuarios, f"Usuário {novo_username} editado.")
-            return True, "Usuário atualizado com sucesso!"
-    return False, "Usuário não encontrado."
-
-def deletar_usuario(user_id):
-    usuarios = carregar_usuarios()
-    usuarios_restantes = [u for u in usuarios if u['id'] != user_id]
-    if len(usuarios_restantes) < len(usuarios):
-        salvar_usuarios(usuarios_restantes, f"Usuário com ID {user_id} deletado.")
-
-        # NOVO: Remover também os lembretes do usuário
-        lembretes = carregar_lembretes()
-        lembretes_restantes = [l for l in lembretes if l.get('user_id') != user_id]
-        salvar_lembretes(lembretes_restantes, f"Lembretes do usuário {user_id} removidos após exclusão.")
-
-        return True, "Usuário e seus lembretes deletados com sucesso."
-    return False, "Usuário não encontrado."
+            atualizar_registro(usuarios, user_id, versao_esperada, **campos)
+    except ConflitoVersao as e:
+        return False, f"{e} Suas alterações não foram salvas; confira os dados atuais e tente de novo."
+    return True, "Usuário atualizado com sucesso!"
+
+def deletar_usuario(user_id, versao_esperada=None):
+    """Remove o usuário, seus lembretes e suas configurações numa única transação (um commit)."""
+    return deletar_usuarios({user_id: versao_esperada})
+
+# --- Operações em massa do admin ---
+# Cada operação é uma única transação sobre usuários, lembretes, configurações e contadores: um commit e um push,
+# qualquer que seja o número de usuários; com conflito de versão ou validação falhando, nada é gravado.
+def _arquivos_operacoes_usuarios():
+    return {USUARIOS_FILE: [], LEMBRETES_FILE: [], CONFIG_FILE: {}, ESTATISTICAS_FILE: None}
+
+def _validar_admins_restantes(usuarios, ids_afetados):
+    """Mensagem de erro se a operação deixaria o sistema sem nenhum admin, senão None."""
+    if not any(u.get('role') == 'admin' and u['id'] not in ids_afetados for u in usuarios):
+        return "A operação deixaria o sistema sem nenhum administrador."
+    return None
+
+def _transferir_lembretes(dados, estatisticas, de_user_ids, para_user_id):
+    transferidos = 0
+    for lembrete in dados[LEMBRETES_FILE]:
+        if lembrete.get('user_id') in de_user_ids:
+            registrar_transferencia(estatisticas, lembrete, para_user_id)
+            lembrete['user_id'] = para_user_id
+            incrementar_versao(lembrete)
+            transferidos += 1
+    return transferidos
+
+def deletar_usuarios(versoes_esperadas, reatribuir_para=None):
+    """Remove os usuários {id: versão lida}. Os lembretes deles são apagados ou, com `reatribuir_para`, passados a esse usuário;
+    as entradas deles no config.json e nos contadores saem junto. Retorna (sucesso, mensagem)."""
+    ids = set(versoes_esperadas)
+    if reatribuir_para in ids:
+        return False, "O usuário que receberá os lembretes não pode estar entre os deletados."
+    try:
+        with transacao_com_commit(_arquivos_operacoes_usuarios(), f"Admin: {len(ids)} usuário(s) deletado(s).") as dados:
+            usuarios = dados[USUARIOS_FILE]
+            if not any(u['id'] in ids for u in usuarios):
+                return False, "Usuário não encontrado."
+            if reatribuir_para and not any(u['id'] == reatribuir_para for u in usuarios):
+                return False, "O usuário que receberá os lembretes não foi encontrado."
+            erro = _validar_admins_restantes(usuarios, ids)
+            if erro:
+                return False, erro
+            removidos = remover_registros(usuarios, versoes_esperadas)
+
+            estatisticas = estatisticas_da_transacao(dados)
+            if reatribuir_para:
+                quantidade = _transferir_lembretes(dados, estatisticas, ids, reatribuir_para)
+                destino_lembretes = f"{quantidade} lembrete(s) reatribuído(s)"
+            else:
+                restantes = [l for l in dados[LEMBRETES_FILE] if l.get('user_id') not in ids]
+                destino_lembretes = f"{len(dados[LEMBRETES_FILE]) - len(restantes)} lembrete(s) deletado(s)"
+                dados[LEMBRETES_FILE] = restantes
+            for user_id in ids:
+                remover_usuario(estatisticas, user_id)
+                dados[CONFIG_FILE].pop(user_id, None)
+    except ConflitoVersao as e:
+        return False, f"{e} Nenhum usuário foi deletado; confira os dados atuais e tente de novo."
+    return True, f"{len(removidos)} usuário(s) deletado(s) com sucesso; {destino_lembretes}."
+
+def reatribuir_lembretes(de_user_ids, para_user_id):
+    """Passa todos os lembretes dos usuários `de_user_ids` para `para_user_id` numa única transação."""
+    de_user_ids = set(de_user_ids) - {para_user_id}
+    with transacao_com_commit(_arquivos_operacoes_usuarios(), f"Admin: lembretes de {len(de_user_ids)} usuário(s) reatribuídos.") as dados:
+        if not any(u['id'] == para_user_id for u in dados[USUARIOS_FILE]):
+            return False, "O usuário que receberá os lembretes não foi encontrado."
+        estatisticas = estatisticas_da_transacao(dados)
+        quantidade = _transferir_lembretes(dados, estatisticas, de_user_ids, para_user_id)
+    return True, f"{quantidade} lembrete(s) reatribuído(s) com sucesso."
+
+def alterar_nivel_usuarios(versoes_esperadas, nova_role):
+    """Muda o nível de acesso dos usuários {id: versão lida} numa única transação."""
+    try:
+        with transacao_com_commit(_arquivos_operacoes_usuarios(), f"Admin: nível de acesso de {len(versoes_esperadas)} usuário(s) alterado para {nova_role}.") as dados:
+            usuarios = dados[USUARIOS_FILE]
+            if nova_role != 'admin':
+                erro = _validar_admins_restantes(usuarios, set(versoes_esperadas))
+                if erro:
+                    return False, erro
+            for user_id, versao_esperada in versoes_esperadas.items():
+                atualizar_registro(usuarios, user_id, versao_esperada, role=nova_role)
+    except ConflitoVersao as e:
+        return False, f"{e} Nenhum usuário foi alterado; confira os dados atuais e tente de novo."
+    return True, f"Nível de acesso de {len(versoes_esperadas)} usuário(s) alterado para {nova_role}."
 
 
 def enviar_email(destino, assunto, corpo, usuario_id=None):
@@ -248,12 +414,30 @@ def enviar_email(destino, assunto, corpo, usuario_id=None):
         return False
 
 def get_gravatar_url(email):
-    if not email:
-        return "https://www.gravatar.com/avatar/?d=mp"
-    email_hash = hashlib.md5(email.lower().strip().encode('utf-8')).hexdigest()
-    return f"https://www.gravatar.com/avatar/{email_hash}?d=mp"
+    """Avatar do Gravatar servido do cache local como data URI (sem requisição do navegador a cada renderização)."""
+    return obter_avatar(email)
+
+@st.cache_resource
+def estado_migracao_esquema():
+    """Trava e flag compartilhadas pelas sessões do processo. A migração em si roda fora do cache: mensagens
+    (st.error/st.warning) emitidas dentro de uma função @st.cache_resource seriam repetidas em todas as sessões."""
+    return {"trava": threading.Lock(), "concluida": False}
+
+def garantir_esquema_dados():
+    """Migra os arquivos de dados para a versão atual do esquema uma única vez por processo (não a cada leitura)."""
+    estado = estado_migracao_esquema()
+    with estado["trava"]:
+        if estado["concluida"]:
+            return
+        migrados = migrar_dados()
+        if migrados:
+            salvar_varios_com_commit_json(migrados, f"Dados migrados para a versão {VERSAO_ESQUEMA_ATUAL} do esquema.")
+        # Se nem a gravação local deu certo, a próxima execução do script tenta de novo
+        estado["concluida"] = versao_esquema() >= VERSAO_ESQUEMA_ATUAL
 
 
+garantir_esquema_dados()
+
 # === UI PRINCIPAL - ORDEM CORRIGIDA ===
 
 # Bloco para Forçar Troca de Senha no Primeiro Login (PRIORITÁRIO)
@@ -267,20 +451,16 @@ if st.session_state.senha_inicial_pendente:
     if st.button("Definir Nova Senha"):
         if nova_senha and confirma_senha:
             if nova_senha == confirma_senha:
-                usuarios = carregar_usuarios()
-                user_index = -1
-                for i, user in enumerate(usuarios):
-                    if user['id'] == st.session_state.user_id:
-                        user_index = i
-                        break
-
-                if user_index != -1:
-                    hashed_new_password = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                    usuarios[user_index]['password_hash'] = hashed_new_password
-                    usuarios[user_index]['senha_inicial_definida'] = True
-
-                    salvar_usuarios(usuarios, f"Senha inicial do usuário {st.session_state.username} alterada.")
-
+                hashed_new_password = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                try:
+                    with transacao_com_commit({USUARIOS_FILE: []}, f"Senha inicial do usuário {st.session_state.username} alterada.") as dados:
+                        atualizar_registro(dados[USUARIOS_FILE], st.session_state.user_id, None,
+                                           password_hash=hashed_new_password, senha_inicial_definida=True)
+                    usuario_encontrado = True
+                except ConflitoVersao:
+                    usuario_encontrado = False
+
+                if usuario_encontrado:
                     st.success("Sua senha foi atualizada com sucesso! Você será redirecionado para o login.")
                     st.session_state.senha_inicial_pendente = False
                     st.session_state.logged_in = True
@@ -340,6 +520,11 @@ elif not st.session_state.logged_in:
 
 # Lógica de interface principal após login bem-sucedido (ÚLTIMO na ordem)
 elif st.session_state.logged_in:
+    email_avatar = carregar_configuracoes().get(st.session_state.user_id, {}).get("email_destino")
+    st.sidebar.markdown(
+        f"<img src='{get_gravatar_url(email_avatar)}' width='64' height='64' style='border-radius: 50%;'>",
+        unsafe_allow_html=True
+    )
     st.sidebar.markdown(f"**Bem-vindo, {st.session_state.username}!**")
     if st.sidebar.button("Sair"):
         st.session_state.logged_in = False
@@ -382,7 +567,6 @@ elif st.session_state.logged_in:
 
             if submit_button:
                 if titulo and descricao and data and hora:
-                    lembretes = carregar_lembretes()
                     novo_lembrete = {
                         "id": str(uuid.uuid4()),
                         "user_id": st.session_state.user_id,
@@ -390,10 +574,14 @@ elif st.session_state.logged_in:
                         "descricao": descricao,
                         "data": data.strftime('%Y-%m-%d'),
                         "hora": hora.strftime('%H:%M'),
-                        "enviado": False
+                        "enviado": False,
+                        "versao": 1
                     }
-                    lembretes.append(novo_lembrete)
-                    salvar_lembretes(lembretes, f"Novo lembrete '{titulo}' adicionado por {st.session_state.username}.")
+                    with transacao_com_commit({LEMBRETES_FILE: [], ESTATISTICAS_FILE: None}, f"Novo lembrete '{titulo}' adicionado por {st.session_state.username}.") as dados:
+                        estatisticas = estatisticas_da_transacao(dados)
+                        dados[LEMBRETES_FILE].append(novo_lembrete)
+                        registrar_criacao(estatisticas, novo_lembrete, hoje_str())
+                    obter_indice_busca().adicionar(novo_lembrete)
                     st.success("Lembrete salvo com sucesso!")
                     
                     # --- INÍCIO DA CORREÇÃO ---
@@ -404,10 +592,58 @@ elif st.session_state.logged_in:
                     
                     st.rerun()
 
-        st.subheader("Meus Lembretes Pendentes")
         lembretes = carregar_lembretes()
+        indice_busca = sincronizar_indice_busca(lembretes)
+
+        st.subheader("Buscar Lembretes")
+        col_busca_texto, col_busca_situacao = st.columns([3, 1])
+        with col_busca_texto:
+            termo_busca = st.text_input("Buscar no título ou na descrição", key="busca_texto")
+        with col_busca_situacao:
+            situacao_busca = st.selectbox("Situação", ["Todos", "Pendentes", "Enviados"], key="busca_situacao")
+        filtrar_periodo = st.checkbox("Filtrar por período", key="busca_filtrar_periodo")
+        data_inicio_busca = data_fim_busca = None
+        if filtrar_periodo:
+            hoje = datetime.now(FUSO_HORARIO_BRASIL).date()
+            periodo_busca = st.date_input("Período", value=(hoje, hoje), key="busca_periodo")
+            # Enquanto o usuário escolhe o intervalo, o date_input devolve só a data inicial
+            if len(periodo_busca) == 2:
+                data_inicio_busca, data_fim_busca = periodo_busca
+            elif len(periodo_busca) == 1:
+                data_inicio_busca = periodo_busca[0]
+
+        if termo_busca.strip() or filtrar_periodo or situacao_busca != "Todos":
+            LIMITE_RESULTADOS_BUSCA = 200
+            total_encontrado, ids_encontrados = indice_busca.buscar(
+                termo_busca,
+                user_id=st.session_state.user_id,
+                data_inicio=data_inicio_busca,
+                data_fim=data_fim_busca,
+                enviado={"Todos": None, "Pendentes": False, "Enviados": True}[situacao_busca],
+                limite=LIMITE_RESULTADOS_BUSCA
+            )
+            if ids_encontrados:
+                lembretes_por_id = {l.get('id'): l for l in lembretes}
+                resultados_busca = [lembretes_por_id[i] for i in ids_encontrados if i in lembretes_por_id]
+                df_busca = pd.DataFrame(resultados_busca)
+                df_busca["Data e Hora"] = pd.to_datetime(df_busca["data"] + " " + df_busca["hora"], errors='coerce').dt.strftime('%d/%m/%Y %H:%M')
+                df_busca["Enviado"] = df_busca["enviado"].apply(lambda x: "✅ Sim" if x else "❌ Não")
+                if total_encontrado > len(ids_encontrados):
+                    st.caption(f"Mostrando os {len(ids_encontrados)} primeiros de {total_encontrado} lembretes encontrados.")
+                else:
+                    st.caption(f"{total_encontrado} lembrete(s) encontrado(s).")
+                st.dataframe(
+                    df_busca[['titulo', 'descricao', 'Data e Hora', 'Enviado']],
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("Nenhum lembrete encontrado para essa busca.")
+
+        st.subheader("Meus Lembretes Pendentes")
 
         meus_lembretes = [l for l in lembretes if l.get('user_id') == st.session_state.user_id]
+        versoes_meus_lembretes = versoes_exibidas("versoes_meus_lembretes", meus_lembretes)
 
         if meus_lembretes:
             for lembrete in meus_lembretes:
@@ -447,13 +683,15 @@ elif st.session_state.logged_in:
                 if st.button("Confirmar Deleção de Pendentes"):
                     if lembretes_pendentes_para_deletar_label:
                         ids_para_deletar = [opcoes_pendentes[label] for label in lembretes_pendentes_para_deletar_label]
-                        lembretes_atuais = carregar_lembretes()
-                        lembretes_restantes = [l for l in lembretes_atuais if l['id'] not in ids_para_deletar]
-                        
-                        if len(lembretes_restantes) < len(lembretes_atuais):
-                            salvar_lembretes(lembretes_restantes, f"Lembretes pendentes deletados por {st.session_state.username}.")
-                            st.success("Lembrete(s) pendente(s) deletado(s) com sucesso!")
+                        sucesso, mensagem = deletar_lembretes(
+                            {lembrete_id: versoes_meus_lembretes.get(lembrete_id) for lembrete_id in ids_para_deletar},
+                            f"Lembretes pendentes deletados por {st.session_state.username}."
+                        )
+                        if sucesso:
+                            st.success(mensagem)
                             st.rerun()
+                        else:
+                            st.warning(mensagem)
                     else:
                         st.info("Nenhum lembrete pendente selecionado para deletar.")
             else:
@@ -489,13 +727,15 @@ elif st.session_state.logged_in:
                 if st.button("Confirmar Deleção do Histórico"):
                     if lembretes_historico_para_deletar_label:
                         ids_para_deletar = [opcoes_historico[label] for label in lembretes_historico_para_deletar_label]
-                        lembretes_atuais = carregar_lembretes()
-                        lembretes_restantes = [l for l in lembretes_atuais if l['id'] not in ids_para_deletar]
-
-                        if len(lembretes_restantes) < len(lembretes_atuais):
-                            salvar_lembretes(lembretes_restantes, f"Lembretes do histórico deletados por {st.session_state.username}.")
-                            st.success("Lembrete(s) do histórico deletado(s) com sucesso!")
+                        sucesso, mensagem = deletar_lembretes(
+                            {lembrete_id: versoes_meus_lembretes.get(lembrete_id) for lembrete_id in ids_para_deletar},
+                            f"Lembretes do histórico deletados por {st.session_state.username}."
+                        )
+                        if sucesso:
+                            st.success(mensagem)
                             st.rerun()
+                        else:
+                            st.warning(mensagem)
                     else:
                         st.info("Nenhum lembrete do histórico selecionado para deletar.")
                 # --- FIM DA NOVA FUNCIONALIDADE ---
@@ -506,27 +746,61 @@ elif st.session_state.logged_in:
 
     elif selected_tab == "Configurações de E-mail":
         st.subheader("Configurações de E-mail para Lembretes")
-        configuracoes = carregar_configuracoes()
-
-        user_config = configuracoes.get(st.session_state.user_id, {})
+        user_config = carregar_configuracoes().get(st.session_state.user_id, {})
         email_destino_atual = user_config.get("email_destino", "")
 
         novo_email_destino = st.text_input("Seu E-mail de Destino para Lembretes", value=email_destino_atual)
 
         if st.button("Salvar E-mail de Destino"):
             if novo_email_destino:
-                configuracoes[st.session_state.user_id] = {"email_destino": novo_email_destino}
-                salvar_configuracoes(configuracoes, f"E-mail de destino atualizado para {st.session_state.username}.")
-                st.success(f"E-mail de destino salvo como: {novo_email_destino}")
+                # Mantém as outras configurações do usuário (ex.: webhook) e as dos demais usuários
+                if atualizar_configuracoes_usuario(st.session_state.user_id, {"email_destino": novo_email_destino},
+                                                   f"E-mail de destino atualizado para {st.session_state.username}."):
+                    st.success(f"E-mail de destino salvo como: {novo_email_destino}")
+                else:
+                    st.error("Seu usuário foi removido por outra sessão; as configurações não foram salvas.")
             else:
                 st.error("Por favor, insira um e-mail de destino válido.")
 
+        st.markdown("---")
+        st.subheader("Webhook (Telegram, Discord, Slack...)")
+        st.caption("Além do e-mail, os lembretes também são enviados por POST para esta URL. Para o Telegram, use https://api.telegram.org/bot<TOKEN>/sendMessage?chat_id=<CHAT_ID>.")
+        st.warning("Atenção: a URL do webhook é gravada no config.json, que é commitado no repositório git do app. "
+                   "Quem tiver acesso ao repositório verá a URL e qualquer token contido nela.")
+        webhook_atual = user_config.get("webhook_url", "")
+        novo_webhook = st.text_input("URL do Webhook (deixe em branco para desativar)", value=webhook_atual)
+
+        col_webhook_salvar, col_webhook_testar = st.columns(2)
+        with col_webhook_salvar:
+            if st.button("Salvar Webhook"):
+                if novo_webhook and not novo_webhook.startswith(("https://", "http://")):
+                    st.error("A URL do webhook deve começar com https:// ou http://.")
+                else:
+                    if atualizar_configuracoes_usuario(st.session_state.user_id, {"webhook_url": novo_webhook or None},
+                                                       f"Webhook atualizado para {st.session_state.username}."):
+                        st.success("Webhook salvo." if novo_webhook else "Webhook desativado.")
+                    else:
+                        st.error("Seu usuário foi removido por outra sessão; as configurações não foram salvas.")
+        with col_webhook_testar:
+            if st.button("Enviar Teste para o Webhook"):
+                if novo_webhook:
+                    lembrete_teste = {"id": "teste", "titulo": "Teste de webhook", "descricao": "Mensagem de teste do Jarvis Lembrete.",
+                                      "data": datetime.now(FUSO_HORARIO_BRASIL).strftime('%Y-%m-%d'), "hora": datetime.now(FUSO_HORARIO_BRASIL).strftime('%H:%M')}
+                    canal_teste = CanalWebhook(novo_webhook)
+                    if canal_teste.enviar("⏰ Lembrete: Teste de webhook", "Se você recebeu esta mensagem, o webhook está funcionando.", lembrete_teste):
+                        st.success("Mensagem de teste enviada!")
+                    else:
+                        st.error(f"Falha ao enviar para o webhook: {canal_teste.ultimo_erro}")
+                else:
+                    st.info("Informe a URL do webhook para testar.")
+
     elif selected_tab == "Administração" and st.session_state.user_role == 'admin':
-        admin_tab1, admin_tab2 = st.tabs(["Gerenciar Usuários", "Todos os Lembretes"])
+        admin_tab1, admin_tab2, admin_tab3 = st.tabs(["Gerenciar Usuários", "Todos os Lembretes", "Estatísticas"])
 
         with admin_tab1:
             st.subheader("Gerenciar Usuários")
             usuarios = carregar_usuarios()
+            versoes_usuarios = versoes_exibidas("versoes_usuarios", usuarios)
 
             st.write("### Lista de Usuários")
             if usuarios:
@@ -567,6 +841,7 @@ elif st.session_state.logged_in:
                 if selected_username and selected_username != "Nenhum usuário":
                     selected_user_id = user_options[selected_username]
                     user_to_edit = next(u for u in usuarios if u['id'] == selected_user_id)
+                    versao_usuario_exibida = versoes_usuarios[selected_user_id]
 
                     with st.form(key=f"edit_user_form_{selected_user_id}"):
                         st.write(f"Editando usuário: **{selected_user_id}**")
@@ -584,9 +859,9 @@ elif st.session_state.logged_in:
 
                         if submit_edit_user:
                             if nova_senha:
-                                sucesso, mensagem = editar_usuario(selected_user_id, novo_username, nova_role, nova_senha)
+                                sucesso, mensagem = editar_usuario(selected_user_id, novo_username, nova_role, nova_senha, versao_esperada=versao_usuario_exibida)
                             else:
-                                sucesso, mensagem = editar_usuario(selected_user_id, novo_username, nova_role)
+                                sucesso, mensagem = editar_usuario(selected_user_id, novo_username, nova_role, versao_esperada=versao_usuario_exibida)
 
                             if sucesso:
                                 st.success(mensagem)
@@ -599,7 +874,7 @@ elif st.session_state.logged_in:
                         col_confirm_del = st.columns(2)
                         with col_confirm_del[0]:
                             if st.button(f"Confirmar Deleção de {selected_username}", key=f"final_confirm_del_{selected_user_id}"):
-                                sucesso, mensagem = deletar_usuario(selected_user_id)
+                                sucesso, mensagem = deletar_usuario(selected_user_id, versao_esperada=versao_usuario_exibida)
                                 if sucesso:
                                     st.success(mensagem)
                                     st.session_state[f"confirm_delete_user_{selected_user_id}"] = False
@@ -613,11 +888,71 @@ elif st.session_state.logged_in:
                 else:
                     st.info("Nenhum usuário selecionado ou cadastrado para editar/deletar.")
 
+                st.markdown("---")
+                st.write("### Operações em Massa")
+                st.caption("Cada operação é aplicada de uma vez a todos os usuários selecionados, num único salvamento: ou tudo é aplicado, ou nada.")
+                usernames_por_id = {u['id']: u['username'] for u in usuarios}
+                ids_selecionados = st.multiselect(
+                    "Usuários:", options=list(usernames_por_id), format_func=usernames_por_id.get, key="massa_usuarios"
+                )
+                operacao_massa = st.radio(
+                    "Operação:", ["Alterar nível de acesso", "Reatribuir lembretes", "Deletar usuários"],
+                    horizontal=True, key="massa_operacao"
+                )
+                outros_ids = [user_id for user_id in usernames_por_id if user_id not in ids_selecionados]
+
+                destino_lembretes = None
+                if operacao_massa == "Alterar nível de acesso":
+                    nova_role_massa = st.selectbox("Novo Nível de Acesso", ["normal", "admin"], key="massa_role")
+                elif operacao_massa == "Reatribuir lembretes":
+                    destino_lembretes = st.selectbox(
+                        "Passar os lembretes para:", options=outros_ids, format_func=usernames_por_id.get, key="massa_destino"
+                    )
+                else:
+                    if st.checkbox("Passar os lembretes para outro usuário em vez de deletá-los", key="massa_reatribuir_ao_deletar"):
+                        destino_lembretes = st.selectbox(
+                            "Passar os lembretes para:", options=outros_ids, format_func=usernames_por_id.get, key="massa_destino_delecao"
+                        )
+                    confirmacao_massa = st.checkbox(
+                        "Confirmo a exclusão dos usuários selecionados e de suas configurações. Esta ação é irreversível.",
+                        key="massa_confirmar_delecao"
+                    )
+
+                if st.button("Aplicar aos Usuários Selecionados", key="massa_aplicar"):
+                    resultado_massa = None
+                    if not ids_selecionados:
+                        st.info("Nenhum usuário selecionado.")
+                    elif operacao_massa != "Reatribuir lembretes" and st.session_state.user_id in ids_selecionados:
+                        st.error("Você não pode deletar nem alterar o nível de acesso da sua própria conta por aqui.")
+                    elif operacao_massa == "Alterar nível de acesso":
+                        resultado_massa = alterar_nivel_usuarios({user_id: versoes_usuarios[user_id] for user_id in ids_selecionados}, nova_role_massa)
+                    elif operacao_massa == "Reatribuir lembretes":
+                        if destino_lembretes:
+                            resultado_massa = reatribuir_lembretes(ids_selecionados, destino_lembretes)
+                        else:
+                            st.error("Selecione o usuário que receberá os lembretes.")
+                    elif not confirmacao_massa:
+                        st.warning("Marque a confirmação para deletar os usuários selecionados.")
+                    else:
+                        resultado_massa = deletar_usuarios({user_id: versoes_usuarios[user_id] for user_id in ids_selecionados}, destino_lembretes)
+
+                    if resultado_massa:
+                        sucesso, mensagem = resultado_massa
+                        if sucesso:
+                            st.session_state.massa_resultado = mensagem
+                            del st.session_state.massa_usuarios
+                            st.rerun()
+                        else:
+                            st.warning(mensagem)
+                if st.session_state.get("massa_resultado"):
+                    st.success(st.session_state.pop("massa_resultado"))
+
 
         with admin_tab2:
             st.subheader("Todos os Lembretes do Sistema")
             all_lembretes = carregar_lembretes()
-            
+            versoes_todos_lembretes = versoes_exibidas("versoes_todos_lembretes", all_lembretes)
+
             for lembrete in all_lembretes:
                 lembrete.setdefault('user_id', 'Desconhecido')
                 lembrete.setdefault('enviado', False) # Garante compatibilidade
@@ -660,18 +995,61 @@ elif st.session_state.logged_in:
                 if st.button("Confirmar Deleção (Admin)"):
                     if lembretes_para_deletar_admin_label:
                         ids_para_deletar = [opcoes_all_lembretes[label] for label in lembretes_para_deletar_admin_label]
-                        
-                        lembretes_atuais = carregar_lembretes()
-                        lembretes_restantes = [l for l in lembretes_atuais if l.get('id') not in ids_para_deletar]
-
-                        if len(lembretes_restantes) < len(lembretes_atuais):
-                            salvar_lembretes(lembretes_restantes, f"Lembretes deletados pelo admin {st.session_state.username}.")
-                            st.success(f"{len(ids_para_deletar)} lembrete(s) deletado(s) com sucesso!")
+                        sucesso, mensagem = deletar_lembretes(
+                            {lembrete_id: versoes_todos_lembretes.get(lembrete_id) for lembrete_id in ids_para_deletar},
+                            f"Lembretes deletados pelo admin {st.session_state.username}."
+                        )
+                        if sucesso:
+                            st.success(mensagem)
                             st.rerun()
                         else:
-                            st.warning("Os lembretes selecionados não foram encontrados.")
+                            st.warning(mensagem)
                     else:
                         st.info("Nenhum lembrete selecionado para deletar.")
                 # --- FIM DA FUNCIONALIDADE DE EXCLUSÃO PARA ADMIN ---
             else:
-                st.info("Nenhum lembrete cadastrado no sistema.")
\ No newline at end of file
+                st.info("Nenhum lembrete cadastrado no sistema.")
+
+        with admin_tab3:
+            st.subheader("Estatísticas do Sistema")
+            # Lê apenas os contadores mantidos pelo app e pelo scheduler; não varre os lembretes
+            estatisticas = obter_estatisticas()
+            por_usuario = estatisticas["por_usuario"]
+
+            col_pendentes, col_enviados, col_falhas = st.columns(3)
+            col_pendentes.metric("Pendentes", sum(c["pendentes"] for c in por_usuario.values()))
+            col_enviados.metric("Enviados", sum(c["enviados"] for c in por_usuario.values()))
+            col_falhas.metric("Falhas de envio", sum(c["falhas"] for c in por_usuario.values()))
+
+            st.write("### Lembretes por Usuário")
+            if por_usuario:
+                user_map = {u['id']: u['username'] for u in carregar_usuarios()}
+                df_por_usuario = pd.DataFrame([
+                    {"Usuário": user_map.get(user_id, 'Desconhecido'), "Pendentes": c["pendentes"], "Enviados": c["enviados"], "Falhas": c["falhas"]}
+                    for user_id, c in por_usuario.items()
+                ]).sort_values("Usuário")
+                st.dataframe(df_por_usuario, hide_index=True, use_container_width=True)
+            else:
+                st.info("Nenhum lembrete contabilizado ainda.")
+
+            st.write("### Volume Diário (últimos 30 dias)")
+            volume_diario = estatisticas["volume_diario"]
+            if volume_diario:
+                dias_recentes = sorted(volume_diario)[-30:]
+                df_volume = pd.DataFrame(
+                    [{"Criados": volume_diario[d]["criados"], "Enviados": volume_diario[d]["enviados"], "Falhas": volume_diario[d]["falhas"],
+                      "Descartados": volume_diario[d].get("descartados", 0)} for d in dias_recentes],
+                    index=pd.to_datetime(dias_recentes)
+                )
+                st.bar_chart(df_volume)
+            else:
+                st.info("Ainda não há volume diário registrado.")
+
+            st.write("### Atraso entre o Horário do Lembrete e o Envio")
+            atraso_envio = estatisticas["atraso_envio"]
+            if any(atraso_envio.values()):
+                rotulos = [rotulo for _, rotulo in FAIXAS_ATRASO]
+                df_atraso = pd.DataFrame({"Envios": [atraso_envio.get(r, 0) for r in rotulos]}, index=pd.CategoricalIndex(rotulos, categories=rotulos, ordered=True))
+                st.bar_chart(df_atraso)
+            else:
+                st.info("Nenhum envio com atraso medido ainda.")
\ No newline at end of file
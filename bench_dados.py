@@ -0,0 +1,92 @@
+"""Benchmark de leitura/gravação dos arquivos de dados.
+
+Compara o formato antigo (json + indent=4) com o codec do dados.py (orjson,
+quando instalado, e o json da biblioteca padrão em formato compacto), com
+lembretes sintéticos:
+
+    python bench_dados.py --registros 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import dados
+
+
+def gerar_lembretes(quantidade):
+    inicio = datetime(2025, 1, 1, 8, 0)
+    usuarios = [str(uuid.uuid4()) for _ in range(50)]
+    lembretes = []
+    for i in range(quantidade):
+        data_hora = inicio + timedelta(minutes=17 * i)
+        lembretes.append({
+            "id": str(uuid.uuid4()),
+            "titulo": f"Lembrete {i} – reunião de acompanhamento",
+            "descricao": f"Levar o relatório nº {i} e confirmar a pauta com a equipe de operações.",
+            "data": data_hora.strftime('%Y-%m-%d'),
+            "hora": data_hora.strftime('%H:%M'),
+            "user_id": usuarios[i % len(usuarios)],
+            "enviado": i % 3 == 0,
+        })
+    return lembretes
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do codec JSON dos arquivos de dados.")
+    parser.add_argument("--registros", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    lembretes = gerar_lembretes(args.registros)
+    orjson_original = dados.orjson
+    codecs = [("json indent=4 (antigo)", None)]
+    if orjson_original is not None:
+        codecs.append(("dados.py + orjson", orjson_original))
+    codecs.append(("dados.py + json compacto", False))
+
+    print(f"{args.registros} lembretes, mediana de {args.repeticoes} repetições")
+    print(f"{'codec':<26}{'gravar (s)':>12}{'ler (s)':>10}{'tamanho (MB)':>15}")
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "lembretes.json")
+        for nome, modulo in codecs:
+            if modulo is None:
+                def gravar():
+                    with open(caminho, 'w', encoding='utf-8') as f:
+                        json.dump(lembretes, f, indent=4, ensure_ascii=False)
+
+                def ler():
+                    with open(caminho, 'r', encoding='utf-8') as f:
+                        json.load(f)
+            else:
+                # False desliga o orjson para medir o fallback da biblioteca padrão
+                dados.orjson = modulo or None
+
+                def gravar():
+                    dados.salvar_json(caminho, lembretes)
+
+                def ler():
+                    dados.carregar_json(caminho)
+
+            tempo_gravacao = medir(gravar, args.repeticoes)
+            tempo_leitura = medir(ler, args.repeticoes)
+            tamanho = os.path.getsize(caminho) / (1024 * 1024)
+            print(f"{nome:<26}{tempo_gravacao:>12.3f}{tempo_leitura:>10.3f}{tamanho:>15.1f}")
+    dados.orjson = orjson_original
+
+
+if __name__ == '__main__':
+    main()
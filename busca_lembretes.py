@@ -0,0 +1,181 @@
+"""Índice invertido para busca de lembretes por título e descrição.
+
+O índice fica em memória e é mantido incrementalmente: inserções e deleções
+mexem só nos termos do lembrete afetado, sem reconstruir tudo. A busca ignora
+acentos e maiúsculas ("reuniao" encontra "Reunião") e o último termo da
+consulta casa por prefixo, para funcionar enquanto o usuário digita.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+_PADRAO_TERMO = re.compile(r"\w+")
+# Tabela para str.translate que apaga os diacríticos (marcas combinantes) deixados pela decomposição NFKD
+_SEM_DIACRITICOS = {cp: None for cp in range(0x10000) if unicodedata.combining(chr(cp))}
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "Reunião às 10h" -> "reuniao as 10h"."""
+    texto = str(texto).casefold()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize('NFKD', texto).translate(_SEM_DIACRITICOS)
+
+
+def extrair_termos(texto):
+    return _PADRAO_TERMO.findall(normalizar(texto))
+
+
+def _como_texto_de_data(valor):
+    # Aceita date/datetime ou string 'YYYY-MM-DD'; strings ISO comparam na ordem cronológica
+    if valor is None:
+        return None
+    return valor.isoformat()[:10] if hasattr(valor, 'isoformat') else str(valor)
+
+
+class IndiceLembretes:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}       # termo -> set(ids)
+        self._vocabulario = []    # termos em ordem alfabética, para buscas por prefixo
+        self._por_usuario = {}    # user_id -> set(ids)
+        self._registros = {}      # id -> dados do lembrete usados em filtros e na detecção de mudanças
+        self._versao_sincronizada = None
+
+    def __len__(self):
+        return len(self._registros)
+
+    def adicionar(self, lembrete):
+        """Indexa (ou reindexa, se mudou) um lembrete."""
+        with self._lock:
+            self._adicionar(lembrete)
+
+    def remover(self, lembrete_id):
+        with self._lock:
+            self._remover(lembrete_id)
+
+    def sincronizar(self, lembretes, versao=None):
+        """Deixa o índice igual à lista, tocando apenas nos lembretes novos, alterados ou removidos.
+
+        `versao` (ex.: mtime do arquivo) evita até a comparação quando a lista não mudou desde a última chamada.
+        """
+        with self._lock:
+            if versao is not None and versao == self._versao_sincronizada:
+                return
+            self._versao_sincronizada = versao
+            presentes = set()
+            for lembrete in lembretes:
+                self._adicionar(lembrete)
+                presentes.add(lembrete.get('id'))
+            for lembrete_id in [i for i in self._registros if i not in presentes]:
+                self._remover(lembrete_id)
+
+    def buscar(self, consulta="", user_id=None, data_inicio=None, data_fim=None, enviado=None, limite=None):
+        """Busca lembretes que contêm todos os termos da consulta e passam nos filtros.
+
+        Retorna (total, ids), com `ids` em ordem de data/hora e cortado em `limite`, se informado.
+        """
+        data_inicio = _como_texto_de_data(data_inicio)
+        data_fim = _como_texto_de_data(data_fim)
+        termos = extrair_termos(consulta)
+        prefixo = termos.pop() if termos else None
+
+        with self._lock:
+            conjuntos = [self._postings.get(termo, set()) for termo in termos]
+            if user_id is not None:
+                conjuntos.append(self._por_usuario.get(user_id, set()))
+
+            if conjuntos:
+                # Interseção começando pelo menor conjunto
+                conjuntos.sort(key=len)
+                candidatos = set(conjuntos[0])
+                for conjunto in conjuntos[1:]:
+                    if not candidatos:
+                        break
+                    candidatos &= conjunto
+                if prefixo is not None:
+                    # Com poucos candidatos é mais barato conferir o prefixo em cada um do que unir postings
+                    candidatos = {
+                        i for i in candidatos
+                        if prefixo in self._registros[i]["termos"]
+                        or any(t.startswith(prefixo) for t in self._registros[i]["termos"])
+                    }
+            elif prefixo is not None:
+                candidatos = self._ids_com_prefixo(prefixo)
+            else:
+                candidatos = self._registros.keys()
+
+            resultado = []
+            for lembrete_id in candidatos:
+                registro = self._registros[lembrete_id]
+                if enviado is not None and registro["enviado"] != enviado:
+                    continue
+                if data_inicio and registro["data"] < data_inicio:
+                    continue
+                if data_fim and registro["data"] > data_fim:
+                    continue
+                resultado.append(lembrete_id)
+
+            chave = lambda i: (self._registros[i]["data"], self._registros[i]["hora"])
+            if limite is not None and limite < len(resultado):
+                return len(resultado), heapq.nsmallest(limite, resultado, key=chave)
+            return len(resultado), sorted(resultado, key=chave)
+
+    # --- Funções internas (chamadas com o lock já adquirido) ---
+    def _adicionar(self, lembrete):
+        lembrete_id = lembrete.get('id')
+        if not lembrete_id:
+            return
+        assinatura = (
+            lembrete.get('titulo', ''), lembrete.get('descricao', ''), lembrete.get('user_id'),
+            str(lembrete.get('data', '')), str(lembrete.get('hora', '')), bool(lembrete.get('enviado', False))
+        )
+        atual = self._registros.get(lembrete_id)
+        if atual is not None:
+            if atual["assinatura"] == assinatura:
+                return
+            self._remover(lembrete_id)
+
+        titulo, descricao, user_id, data, hora, enviado = assinatura
+        termos = set(extrair_termos(titulo)) | set(extrair_termos(descricao))
+        for termo in termos:
+            ids = self._postings.get(termo)
+            if ids is None:
+                ids = self._postings[termo] = set()
+                bisect.insort(self._vocabulario, termo)
+            ids.add(lembrete_id)
+        self._por_usuario.setdefault(user_id, set()).add(lembrete_id)
+        self._registros[lembrete_id] = {
+            "assinatura": assinatura,
+            "termos": termos,
+            "user_id": user_id,
+            "data": data,
+            "hora": hora,
+            "enviado": enviado,
+        }
+
+    def _remover(self, lembrete_id):
+        registro = self._registros.pop(lembrete_id, None)
+        if registro is None:
+            return
+        for termo in registro["termos"]:
+            ids = self._postings[termo]
+            ids.discard(lembrete_id)
+            if not ids:
+                del self._postings[termo]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, termo)]
+        ids_usuario = self._por_usuario.get(registro["user_id"])
+        if ids_usuario is not None:
+            ids_usuario.discard(lembrete_id)
+            if not ids_usuario:
+                del self._por_usuario[registro["user_id"]]
+
+    def _ids_com_prefixo(self, prefixo):
+        ids = set()
+        posicao = bisect.bisect_left(self._vocabulario, prefixo)
+        while posicao < len(self._vocabulario) and self._vocabulario[posicao].startswith(prefixo):
+            ids |= self._postings[self._vocabulario[posicao]]
+            posicao += 1
+        return ids
@@ -0,0 +1,201 @@
+"""Cache local de avatares do Gravatar.
+
+O navegador nunca busca o Gravatar: o app entrega a imagem embutida (data URI)
+a partir do disco. Avatares ausentes ou vencidos são baixados/revalidados em
+segundo plano (ETag / If-Modified-Since) pela sessão HTTP compartilhada; até lá,
+e sempre que não houver rede, é usado o avatar em cache ou um placeholder com a
+inicial do e-mail gerado localmente. O tamanho da pasta é limitado com
+descarte LRU.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from canais_entrega import obter_sessao
+
+PASTA_CACHE_AVATARES = os.getenv("PASTA_CACHE_AVATARES", ".cache_avatares")
+TAMANHO_MAXIMO_CACHE_BYTES = int(os.getenv("TAMANHO_MAXIMO_CACHE_AVATARES", str(5 * 1024 * 1024)))
+REVALIDAR_APOS_SEGUNDOS = 24 * 60 * 60
+# Sem rede, espera este tempo antes de tentar o Gravatar de novo
+NOVA_TENTATIVA_APOS_FALHA_SEGUNDOS = 60 * 60
+TIMEOUT_GRAVATAR = (2, 3)
+CORES_PLACEHOLDER = ["#1abc9c", "#3498db", "#9b59b6", "#e67e22", "#e74c3c", "#34495e", "#16a085", "#d35400"]
+
+_lock = threading.Lock()
+_em_memoria = {}       # chave -> (data_uri, próxima verificação)
+_em_andamento = set()  # chaves sendo baixadas agora
+_ultimo_uso = {}       # chave -> momento do último obter_avatar (ordem do descarte LRU)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache_avatares")
+
+
+def hash_email(email):
+    return hashlib.md5((email or "").lower().strip().encode('utf-8')).hexdigest()
+
+
+def gerar_placeholder(email, tamanho=80):
+    """SVG com a inicial do e-mail sobre uma cor derivada do hash, como data URI."""
+    inicial = (email or "?").strip()[:1].upper() or "?"
+    cor = CORES_PLACEHOLDER[int(hash_email(email), 16) % len(CORES_PLACEHOLDER)]
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{tamanho}" height="{tamanho}" viewBox="0 0 80 80">'
+        f'<circle cx="40" cy="40" r="40" fill="{cor}"/>'
+        f'<text x="40" y="53" font-family="sans-serif" font-size="38" fill="#fff" text-anchor="middle">{inicial}</text>'
+        '</svg>'
+    )
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+
+def obter_avatar(email, tamanho=80):
+    """Data URI do avatar. Nunca faz requisição no caminho da renderização."""
+    if not email:
+        return gerar_placeholder(email, tamanho)
+    chave = f"{hash_email(email)}_{tamanho}"
+    agora = time.time()
+
+    with _lock:
+        # Todo acesso conta para o LRU, inclusive os servidos da memória (que não tocam no arquivo)
+        _ultimo_uso[chave] = agora
+        em_memoria = _em_memoria.get(chave)
+    if em_memoria is None:
+        em_memoria = _ler_do_disco(chave, email, tamanho)
+        if em_memoria is not None:
+            with _lock:
+                _em_memoria[chave] = em_memoria
+
+    if em_memoria is None:
+        _agendar_download(chave, email, tamanho)
+        return gerar_placeholder(email, tamanho)
+
+    data_uri, proxima_verificacao = em_memoria
+    if agora >= proxima_verificacao:
+        _agendar_download(chave, email, tamanho)
+    return data_uri
+
+
+# --- Funções internas ---
+def _caminhos(chave):
+    return os.path.join(PASTA_CACHE_AVATARES, f"{chave}.img"), os.path.join(PASTA_CACHE_AVATARES, f"{chave}.json")
+
+
+def _ler_metadados(caminho_meta):
+    try:
+        with open(caminho_meta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+
+
+def _ler_do_disco(chave, email, tamanho):
+    """(data_uri, próxima verificação) a partir do disco, ou None se não há nada em cache."""
+    caminho_img, caminho_meta = _caminhos(chave)
+    meta = _ler_metadados(caminho_meta)
+    if meta is None:
+        return None
+    if meta.get("sem_avatar") or not os.path.exists(caminho_img):
+        # Sem Gravatar cadastrado, ou o download ainda não deu certo (offline): placeholder até a próxima verificação
+        data_uri = gerar_placeholder(email, tamanho)
+    else:
+        with open(caminho_img, 'rb') as f:
+            conteudo = f.read()
+        data_uri = f"data:{meta.get('content_type', 'image/png')};base64," + base64.b64encode(conteudo).decode('ascii')
+        # Marca o uso no arquivo: o LRU continua valendo depois de reiniciar o processo
+        os.utime(caminho_img)
+    return data_uri, meta.get("proxima_verificacao", 0)
+
+
+def _agendar_download(chave, email, tamanho):
+    with _lock:
+        if chave in _em_andamento:
+            return
+        _em_andamento.add(chave)
+    _executor.submit(_baixar, chave, email, tamanho)
+
+
+def _baixar(chave, email, tamanho):
+    try:
+        os.makedirs(PASTA_CACHE_AVATARES, exist_ok=True)
+        caminho_img, caminho_meta = _caminhos(chave)
+        meta = _ler_metadados(caminho_meta) or {}
+        cabecalhos = {}
+        if not os.path.exists(caminho_img):
+            # Sem a imagem em disco um 304 não serviria de nada: pede a imagem completa
+            meta.pop("etag", None)
+            meta.pop("last_modified", None)
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+
+        # d=404: sem Gravatar cadastrado, usamos o placeholder local em vez da imagem genérica remota
+        url = f"https://www.gravatar.com/avatar/{hash_email(email)}?s={tamanho}&d=404"
+        try:
+            resposta = obter_sessao().get(url, headers=cabecalhos, timeout=TIMEOUT_GRAVATAR)
+        except requests.RequestException as e:
+            print(f"DEBUG: Gravatar indisponível ({e}). Usando avatar em cache/placeholder.")
+            meta["proxima_verificacao"] = time.time() + NOVA_TENTATIVA_APOS_FALHA_SEGUNDOS
+            _salvar_metadados(caminho_meta, meta)
+            return
+
+        meta["proxima_verificacao"] = time.time() + REVALIDAR_APOS_SEGUNDOS
+        if resposta.status_code == 200:
+            with open(caminho_img, 'wb') as f:
+                f.write(resposta.content)
+            meta.update({
+                "sem_avatar": False,
+                "etag": resposta.headers.get("ETag"),
+                "last_modified": resposta.headers.get("Last-Modified"),
+                "content_type": resposta.headers.get("Content-Type", "image/png"),
+            })
+        elif resposta.status_code == 404:
+            meta = {"sem_avatar": True, "proxima_verificacao": meta["proxima_verificacao"]}
+            if os.path.exists(caminho_img):
+                os.remove(caminho_img)
+        elif resposta.status_code != 304:
+            # Erro do servidor: mantém o que há em cache e tenta de novo mais tarde
+            meta["proxima_verificacao"] = time.time() + NOVA_TENTATIVA_APOS_FALHA_SEGUNDOS
+        _salvar_metadados(caminho_meta, meta)
+        _descartar_excedente()
+    except OSError as e:
+        print(f"DEBUG: Erro no cache de avatares: {e}")
+    finally:
+        with _lock:
+            _em_memoria.pop(chave, None)
+            _em_andamento.discard(chave)
+
+
+def _salvar_metadados(caminho_meta, meta):
+    with open(caminho_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _descartar_excedente():
+    """Remove as imagens usadas há mais tempo até a pasta caber no limite.
+
+    O último uso é o mais recente entre o mtime do arquivo (uso em processos anteriores) e o registrado em memória.
+    """
+    with _lock:
+        ultimo_uso = dict(_ultimo_uso)
+    imagens = []
+    for nome in os.listdir(PASTA_CACHE_AVATARES):
+        if nome.endswith(".img"):
+            chave = nome[:-len(".img")]
+            estado = os.stat(os.path.join(PASTA_CACHE_AVATARES, nome))
+            imagens.append((max(estado.st_mtime, ultimo_uso.get(chave, 0)), estado.st_size, chave))
+    total = sum(tamanho for _, tamanho, _ in imagens)
+    for _, tamanho, chave in sorted(imagens):
+        if total <= TAMANHO_MAXIMO_CACHE_BYTES:
+            break
+        for caminho in _caminhos(chave):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        with _lock:
+            # A cópia em memória também sai, senão o avatar descartado continuaria sendo servido
+            _em_memoria.pop(chave, None)
+            _ultimo_uso.pop(chave, None)
+        total -= tamanho
@@ -0,0 +1,137 @@
+"""Canais de entrega de lembretes: e-mail e webhook.
+
+Cada canal implementa `enviar(assunto, corpo, lembrete)` e retorna True/False.
+`enviar_por_canais` dispara todos os canais de um lembrete em paralelo.
+
+O webhook faz POST de um JSON com o texto nos campos "content" (Discord) e
+"text" (Slack e Telegram). Para o Telegram, use a URL
+https://api.telegram.org/bot<TOKEN>/sendMessage?chat_id=<CHAT_ID>.
+
+A URL do webhook costuma conter segredos (ex.: o token do bot). Mensagens de
+erro e logs só citam o host e o código HTTP/tipo do erro, nunca o caminho ou a
+query: o erro vai para o status_agendador.json, que é commitado e servido sem
+autenticação pelo `?ping` e pelo /health.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (conexão, leitura) em segundos
+TIMEOUT_WEBHOOK = (float(os.getenv("TIMEOUT_WEBHOOK_CONEXAO", "3.05")), float(os.getenv("TIMEOUT_WEBHOOK_LEITURA", "10")))
+# Requisições simultâneas por host (também é o tamanho do pool de conexões keep-alive por host)
+MAX_CONEXOES_POR_HOST = int(os.getenv("MAX_CONEXOES_POR_HOST", "4"))
+
+_lock = threading.Lock()
+_sessao = None
+_semaforos_por_host = {}
+_executor = None
+
+
+def obter_sessao():
+    """requests.Session compartilhada: reaproveita conexões (keep-alive) entre envios."""
+    global _sessao
+    with _lock:
+        if _sessao is None:
+            # Repete só falhas de conexão e respostas de "tente de novo" (429/503), respeitando o Retry-After
+            retry = Retry(total=2, connect=2, read=0, status=2, status_forcelist=[429, 503],
+                          allowed_methods=None, backoff_factor=0.5, respect_retry_after_header=True)
+            adaptador = HTTPAdapter(pool_connections=10, pool_maxsize=MAX_CONEXOES_POR_HOST, max_retries=retry)
+            _sessao = requests.Session()
+            _sessao.mount("https://", adaptador)
+            _sessao.mount("http://", adaptador)
+        return _sessao
+
+
+def _semaforo_do_host(host):
+    with _lock:
+        if host not in _semaforos_por_host:
+            _semaforos_por_host[host] = threading.BoundedSemaphore(MAX_CONEXOES_POR_HOST)
+        return _semaforos_por_host[host]
+
+
+def _obter_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="canal_entrega")
+        return _executor
+
+
+class CanalEntrega(ABC):
+    """Canal de entrega de lembretes. Subclasses implementam `enviar`."""
+    nome = "canal"
+
+    @abstractmethod
+    def enviar(self, assunto, corpo, lembrete):
+        """Envia o lembrete; retorna True se o canal entregou."""
+
+
+class CanalEmail(CanalEntrega):
+    """Adapta uma função `enviar_email(destino, assunto, corpo)` já existente."""
+    nome = "e-mail"
+
+    def __init__(self, funcao_envio, destino):
+        self.funcao_envio = funcao_envio
+        self.destino = destino
+
+    def enviar(self, assunto, corpo, lembrete):
+        return self.funcao_envio(self.destino, assunto, corpo)
+
+
+class CanalWebhook(CanalEntrega):
+    nome = "webhook"
+
+    def __init__(self, url, sessao=None, timeout=TIMEOUT_WEBHOOK):
+        self.url = url
+        self.sessao = sessao
+        self.timeout = timeout
+        self.ultimo_erro = None
+
+    def descrever_erro(self, erro):
+        """Descrição do erro sem a URL (que pode conter o token): host + código HTTP ou tipo da exceção."""
+        host = urlsplit(self.url).netloc
+        resposta = getattr(erro, "response", None)
+        if resposta is not None:
+            return f"{host}: HTTP {resposta.status_code}"
+        return f"{host}: {type(erro).__name__}"
+
+    def enviar(self, assunto, corpo, lembrete):
+        texto = f"{assunto}\n\n{corpo}"
+        payload = {
+            "content": texto,
+            "text": texto,
+            "lembrete": {campo: lembrete.get(campo) for campo in ("id", "titulo", "descricao", "data", "hora")},
+        }
+        sessao = self.sessao or obter_sessao()
+        try:
+            with _semaforo_do_host(urlsplit(self.url).netloc):
+                resposta = sessao.post(self.url, json=payload, timeout=self.timeout)
+            resposta.raise_for_status()
+            print(f"Lembrete enviado com sucesso via webhook ({urlsplit(self.url).netloc}): '{assunto}'")
+            return True
+        except requests.RequestException as e:
+            self.ultimo_erro = self.descrever_erro(e)
+            print(f"ERRO NO WEBHOOK ({self.ultimo_erro})")
+            return False
+
+
+def enviar_por_canais(canais, assunto, corpo, lembrete):
+    """Envia pelo conjunto de canais em paralelo. Retorna {nome_do_canal: True/False}."""
+    if len(canais) == 1:
+        return {canais[0].nome: canais[0].enviar(assunto, corpo, lembrete)}
+    executor = _obter_executor()
+    futuros = {canal.nome: executor.submit(canal.enviar, assunto, corpo, lembrete) for canal in canais}
+    resultados = {}
+    for nome, futuro in futuros.items():
+        try:
+            resultados[nome] = futuro.result()
+        except Exception as e:
+            print(f"Erro inesperado no canal {nome}: {e}")
+            resultados[nome] = False
+    return resultados
@@ -0,0 +1,275 @@
+"""Camada de acesso aos arquivos JSON de dados (lembretes, usuários, configurações...).
+
+- Usa o orjson quando instalado e cai para o json da biblioteca padrão.
+- Grava em formato compacto, com um registro por linha nas listas, o que mantém
+  os diffs do git legíveis sem o custo do indent=4.
+- A gravação é atômica (arquivo temporário + os.replace): quem lê nunca vê um
+  arquivo pela metade.
+- O esquema dos dados tem versão (esquema.json). Migrações rodam uma única vez,
+  na atualização, em vez de corrigir os dados a cada leitura:
+
+    python dados.py migrar
+
+- Cada registro (usuário, lembrete) tem um campo "versao". Alterações usam
+  compare-and-swap: quem edita informa a versão que leu e recebe um
+  ConflitoVersao se outro processo mudou o registro nesse meio-tempo. A leitura,
+  a verificação e a gravação acontecem numa `Transacao`, que trava os arquivos só
+  durante esses milissegundos (nunca durante o commit/push do git); edições de
+  registros diferentes não conflitam.
+"""
+import json
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError: # Windows: sem trava entre processos (uso local de desenvolvimento)
+    fcntl = None
+
+LEMBRETES_FILE = 'lembretes.json'
+CONFIG_FILE = 'config.json'
+USUARIOS_FILE = 'usuarios.json'
+ESQUEMA_FILE = 'esquema.json'
+VERSAO_ESQUEMA_ATUAL = 3
+
+
+# --- Codec ---
+def carregar_json(caminho):
+    """Como json.load: levanta FileNotFoundError ou json.JSONDecodeError (o erro do orjson é subclasse dele)."""
+    with open(caminho, 'rb') as f:
+        return _decodificar(f.read())
+
+
+def _decodificar(conteudo):
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+
+def _serializar_valor(valor):
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serializar(dados):
+    """JSON compacto; listas saem com um registro por linha."""
+    if isinstance(dados, list):
+        if not dados:
+            return b"[]\n"
+        return b"[\n" + b",\n".join(_serializar_valor(item) for item in dados) + b"\n]\n"
+    return _serializar_valor(dados) + b"\n"
+
+
+def salvar_json(caminho, dados):
+    _gravar_bytes(caminho, serializar(dados))
+
+
+def _gravar_bytes(caminho, conteudo):
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    descritor, caminho_temporario = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=diretorio)
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            f.write(conteudo)
+        os.replace(caminho_temporario, caminho)
+    except BaseException:
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        raise
+
+
+# --- Versões por registro e transações ---
+class ConflitoVersao(Exception):
+    """O registro foi alterado ou removido por outra sessão depois de ter sido lido; nada foi gravado."""
+
+    def __init__(self, registro_id, versao_esperada, versao_atual):
+        self.registro_id = registro_id
+        self.versao_esperada = versao_esperada
+        self.versao_atual = versao_atual
+        if versao_atual is None:
+            mensagem = f"O registro {registro_id} foi removido por outra sessão."
+        else:
+            mensagem = f"O registro {registro_id} foi alterado por outra sessão (versão {versao_esperada} lida, {versao_atual} atual)."
+        super().__init__(mensagem)
+
+
+def versao_registro(registro):
+    # Registros anteriores ao campo (esquema < 3) valem como versão 1
+    return registro.get("versao", 1)
+
+
+def incrementar_versao(registro):
+    registro["versao"] = versao_registro(registro) + 1
+    return registro
+
+
+def atualizar_registro(registros, registro_id, versao_esperada, **campos):
+    """Aplica `campos` ao registro se ele ainda está na `versao_esperada` (None = sem verificação) e incrementa a versão."""
+    for registro in registros:
+        if registro.get("id") == registro_id:
+            if versao_esperada is not None and versao_registro(registro) != versao_esperada:
+                raise ConflitoVersao(registro_id, versao_esperada, versao_registro(registro))
+            registro.update(campos)
+            return incrementar_versao(registro)
+    raise ConflitoVersao(registro_id, versao_esperada, None)
+
+
+def remover_registros(registros, versoes_esperadas):
+    """Remove os registros {id: versão lida}, todos ou nenhum. Retorna a lista dos removidos.
+
+    Um registro que já não existe não é conflito (o resultado desejado já vale); um registro com
+    versão diferente da lida levanta ConflitoVersao sem remover nada.
+    """
+    por_id = {registro.get("id"): registro for registro in registros}
+    for registro_id, versao_esperada in versoes_esperadas.items():
+        registro = por_id.get(registro_id)
+        if registro is not None and versao_esperada is not None and versao_registro(registro) != versao_esperada:
+            raise ConflitoVersao(registro_id, versao_esperada, versao_registro(registro))
+    removidos = [registro for registro in registros if registro.get("id") in versoes_esperadas]
+    registros[:] = [registro for registro in registros if registro.get("id") not in versoes_esperadas]
+    return removidos
+
+
+class _Trava:
+    """Trava exclusiva entre processos (flock) num arquivo <caminho>.lock ao lado do arquivo de dados."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho + ".lock"
+        self.arquivo = None
+
+    def __enter__(self):
+        self.arquivo = open(self.caminho, 'a')
+        if fcntl is not None:
+            fcntl.flock(self.arquivo, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *excecao):
+        if fcntl is not None:
+            fcntl.flock(self.arquivo, fcntl.LOCK_UN)
+        self.arquivo.close()
+        return False
+
+
+class Transacao:
+    """Leitura-modificação-gravação de um ou mais arquivos sob trava.
+
+        with Transacao({LEMBRETES_FILE: [], ESTATISTICAS_FILE: None}) as dados:
+            remover_registros(dados[LEMBRETES_FILE], {lembrete_id: versao})
+
+    `padroes` dá o valor usado quando o arquivo não existe. Se o bloco terminar sem exceção, os
+    arquivos cujo conteúdo mudou são gravados antes de soltar a trava e ficam em `alterados`;
+    com exceção (ex.: ConflitoVersao), nada é gravado.
+    """
+
+    def __init__(self, padroes):
+        self.padroes = padroes
+        self.dados = {}
+        self.alterados = []
+        self._originais = {}
+        self._travas = None
+
+    def __enter__(self):
+        self._travas = ExitStack()
+        try:
+            # Ordem fixa das travas: duas transações sobre os mesmos arquivos nunca se bloqueiam mutuamente
+            for caminho in sorted(self.padroes):
+                self._travas.enter_context(_Trava(caminho))
+            for caminho, padrao in self.padroes.items():
+                try:
+                    with open(caminho, 'rb') as f:
+                        conteudo = f.read()
+                    self.dados[caminho] = _decodificar(conteudo)
+                except (FileNotFoundError, ValueError):
+                    self.dados[caminho] = padrao
+                    conteudo = serializar(padrao)
+                # Comparado com o conteúdo final para gravar só o que mudou
+                self._originais[caminho] = conteudo
+        except BaseException:
+            self._travas.close()
+            raise
+        return self.dados
+
+    def __exit__(self, tipo, valor, rastreamento):
+        with self._travas:
+            if tipo is None:
+                for caminho, dados in self.dados.items():
+                    conteudo = serializar(dados)
+                    if conteudo != self._originais[caminho]:
+                        _gravar_bytes(caminho, conteudo)
+                        self.alterados.append(caminho)
+        return False
+
+
+# --- Versão do esquema e migrações ---
+def versao_esquema():
+    """Versão gravada no esquema.json; dados sem o arquivo são da versão 1 (anterior ao versionamento)."""
+    try:
+        return int(carregar_json(ESQUEMA_FILE).get("versao", 1))
+    except (FileNotFoundError, ValueError, AttributeError):
+        return 1
+
+
+def _ler_ou_padrao(caminho, padrao):
+    try:
+        return carregar_json(caminho)
+    except (FileNotFoundError, ValueError):
+        return padrao
+
+
+def _migrar_para_v2(arquivos):
+    """Preenche campos antes completados em toda leitura e regrava tudo no formato compacto."""
+    for usuario in arquivos[USUARIOS_FILE]:
+        # Usuários anteriores ao campo já tinham senha definida por eles
+        usuario.setdefault("senha_inicial_definida", True)
+    for lembrete in arquivos[LEMBRETES_FILE]:
+        lembrete.setdefault("enviado", False)
+
+
+def _migrar_para_v3(arquivos):
+    """Versão inicial de cada registro, usada no compare-and-swap das edições."""
+    for registro in arquivos[USUARIOS_FILE] + arquivos[LEMBRETES_FILE]:
+        registro.setdefault("versao", 1)
+
+
+MIGRACOES = {
+    2: _migrar_para_v2,
+    3: _migrar_para_v3,
+}
+
+
+def migrar_dados():
+    """Aplica as migrações pendentes em memória. Retorna {arquivo: dados} a gravar (vazio se já está na versão atual).
+
+    Quem chama grava e commita os arquivos (inclusive o esquema.json com a nova versão).
+    """
+    versao = versao_esquema()
+    if versao >= VERSAO_ESQUEMA_ATUAL:
+        return {}
+
+    arquivos = {
+        USUARIOS_FILE: _ler_ou_padrao(USUARIOS_FILE, []),
+        LEMBRETES_FILE: _ler_ou_padrao(LEMBRETES_FILE, []),
+        CONFIG_FILE: _ler_ou_padrao(CONFIG_FILE, {}),
+    }
+    for destino in range(versao + 1, VERSAO_ESQUEMA_ATUAL + 1):
+        print(f"DEBUG: Migrando dados para a versão {destino} do esquema.")
+        MIGRACOES[destino](arquivos)
+    arquivos[ESQUEMA_FILE] = {"versao": VERSAO_ESQUEMA_ATUAL}
+    return arquivos
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ["migrar"]:
+        alterados = migrar_dados()
+        for caminho, dados in alterados.items():
+            salvar_json(caminho, dados)
+        print(f"Arquivos migrados: {', '.join(alterados)}" if alterados else f"Dados já estão na versão {VERSAO_ESQUEMA_ATUAL} do esquema.")
+    else:
+        print("Uso: python dados.py migrar")
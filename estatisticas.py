@@ -0,0 +1,165 @@
+"""Contadores materializados para o painel de estatísticas do admin.
+
+Em vez de varrer todos os lembretes a cada visualização, o app e o scheduler
+atualizam estes contadores no momento em que criam, removem ou enviam um
+lembrete. O painel só lê os arquivos de contadores, então o custo não cresce com
+o histórico.
+
+Cada processo grava o seu arquivo: o app o estatisticas.json e o scheduler o
+estatisticas_agendador.json. Assim o commit do scheduler nunca conflita com um
+commit do app nesses arquivos. Os contadores são incrementos (podem ficar
+negativos num arquivo, ex.: pendentes do scheduler) e o painel soma os dois com
+`combinar_estatisticas`.
+"""
+import json
+
+from dados import carregar_json, salvar_json
+
+ESTATISTICAS_FILE = 'estatisticas.json'
+ESTATISTICAS_AGENDADOR_FILE = 'estatisticas_agendador.json'
+# Volume diário guardado no arquivo (dias mais antigos são descartados)
+DIAS_VOLUME_DIARIO = 90
+# Faixas do histograma de atraso entre o horário do lembrete e o envio: (limite em segundos, rótulo)
+FAIXAS_ATRASO = [
+    (60, "até 1 min"),
+    (5 * 60, "1-5 min"),
+    (15 * 60, "5-15 min"),
+    (60 * 60, "15-60 min"),
+    (6 * 60 * 60, "1-6 h"),
+    (24 * 60 * 60, "6-24 h"),
+    (None, "mais de 24 h"),
+]
+
+
+def estatisticas_vazias():
+    return {
+        "por_usuario": {},     # user_id -> {"pendentes", "enviados", "falhas"}
+        "volume_diario": {},   # 'YYYY-MM-DD' -> {"criados", "enviados", "falhas"}
+        "atraso_envio": {rotulo: 0 for _, rotulo in FAIXAS_ATRASO},
+    }
+
+
+def carregar_estatisticas(caminho=ESTATISTICAS_FILE):
+    """Retorna os contadores, ou None se o arquivo ainda não existe (ver reconstruir_estatisticas)."""
+    try:
+        estatisticas = carregar_json(caminho)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+    return completar_estatisticas(estatisticas)
+
+
+def completar_estatisticas(estatisticas):
+    """Garante as chaves atuais em contadores lidos do arquivo; None se o conteúdo não é válido."""
+    if not isinstance(estatisticas, dict):
+        return None
+    for chave, valor in estatisticas_vazias().items():
+        estatisticas.setdefault(chave, valor)
+    return estatisticas
+
+
+def salvar_estatisticas(estatisticas, caminho=ESTATISTICAS_FILE):
+    salvar_json(caminho, estatisticas)
+
+
+def reconstruir_estatisticas(lembretes, agendador=None):
+    """Varredura completa usada uma única vez, quando o arquivo de contadores do app ainda não existe.
+
+    Os lembretes já refletem os envios do scheduler; os incrementos dele (`agendador`) são descontados
+    para não contarem duas vezes na soma. O atraso de envios antigos não é conhecido, então o histograma começa vazio.
+    """
+    estatisticas = estatisticas_vazias()
+    for lembrete in lembretes:
+        contadores = _contadores_usuario(estatisticas, lembrete)
+        contadores["enviados" if lembrete.get('enviado', False) else "pendentes"] += 1
+    for user_id, contadores_agendador in (agendador or {}).get("por_usuario", {}).items():
+        contadores = _contadores_usuario(estatisticas, {'user_id': user_id})
+        for chave in ("pendentes", "enviados"):
+            contadores[chave] -= contadores_agendador.get(chave, 0)
+    return estatisticas
+
+
+def combinar_estatisticas(estatisticas_app, estatisticas_agendador):
+    """Soma os contadores do app e do scheduler para exibição.
+
+    Só entram usuários que existem nos contadores do app (usuários deletados saem dali).
+    """
+    combinadas = estatisticas_vazias()
+    agendador = estatisticas_agendador or estatisticas_vazias()
+    for user_id, contadores in estatisticas_app["por_usuario"].items():
+        extra = agendador["por_usuario"].get(user_id, {})
+        combinadas["por_usuario"][user_id] = {
+            chave: max(0, contadores.get(chave, 0) + extra.get(chave, 0)) for chave in ("pendentes", "enviados", "falhas")
+        }
+    for origem in (estatisticas_app, agendador):
+        for dia, volume in origem["volume_diario"].items():
+            destino = combinadas["volume_diario"].setdefault(dia, {"criados": 0, "enviados": 0, "falhas": 0})
+            for chave, valor in volume.items():
+                destino[chave] = destino.get(chave, 0) + valor
+        for rotulo, valor in origem["atraso_envio"].items():
+            combinadas["atraso_envio"][rotulo] = combinadas["atraso_envio"].get(rotulo, 0) + valor
+    for dia_antigo in sorted(combinadas["volume_diario"])[:-DIAS_VOLUME_DIARIO]:
+        del combinadas["volume_diario"][dia_antigo]
+    return combinadas
+
+
+def registrar_criacao(estatisticas, lembrete, dia):
+    _contadores_usuario(estatisticas, lembrete)["pendentes"] += 1
+    _contadores_dia(estatisticas, dia)["criados"] += 1
+
+
+def registrar_remocao(estatisticas, lembrete):
+    contadores = _contadores_usuario(estatisticas, lembrete)
+    chave = "enviados" if lembrete.get('enviado', False) else "pendentes"
+    contadores[chave] -= 1
+
+
+def registrar_envio(estatisticas, lembrete, atraso_segundos, dia):
+    contadores = _contadores_usuario(estatisticas, lembrete)
+    contadores["pendentes"] -= 1
+    contadores["enviados"] += 1
+    _contadores_dia(estatisticas, dia)["enviados"] += 1
+    for limite, rotulo in FAIXAS_ATRASO:
+        if limite is None or atraso_segundos <= limite:
+            estatisticas["atraso_envio"][rotulo] = estatisticas["atraso_envio"].get(rotulo, 0) + 1
+            break
+
+
+def registrar_descarte(estatisticas, lembrete, dia):
+    """Lembrete antigo demais descartado pela recuperação de atrasos: sai dos pendentes sem envio."""
+    contadores = _contadores_usuario(estatisticas, lembrete)
+    contadores["pendentes"] -= 1
+    # No arquivo ele fica marcado como enviado (para não ser tentado de novo), então conta como tal
+    contadores["enviados"] += 1
+    volume = _contadores_dia(estatisticas, dia)
+    volume["descartados"] = volume.get("descartados", 0) + 1
+
+
+def registrar_falha(estatisticas, lembrete, dia):
+    _contadores_usuario(estatisticas, lembrete)["falhas"] += 1
+    _contadores_dia(estatisticas, dia)["falhas"] += 1
+
+
+def registrar_transferencia(estatisticas, lembrete, novo_user_id):
+    """Lembrete passado para outro usuário: o pendente/enviado acompanha o lembrete (o volume diário não muda)."""
+    registrar_remocao(estatisticas, lembrete)
+    chave = "enviados" if lembrete.get('enviado', False) else "pendentes"
+    _contadores_usuario(estatisticas, {'user_id': novo_user_id})[chave] += 1
+
+
+def remover_usuario(estatisticas, user_id):
+    estatisticas["por_usuario"].pop(user_id, None)
+
+
+def _contadores_usuario(estatisticas, lembrete):
+    user_id = lembrete.get('user_id') or 'Desconhecido'
+    return estatisticas["por_usuario"].setdefault(user_id, {"pendentes": 0, "enviados": 0, "falhas": 0})
+
+
+def _contadores_dia(estatisticas, dia):
+    volume = estatisticas["volume_diario"]
+    if dia not in volume:
+        volume[dia] = {"criados": 0, "enviados": 0, "falhas": 0}
+        # Dias chegam em ordem; ao abrir um dia novo descarta os que saíram da janela
+        for dia_antigo in sorted(volume)[:-DIAS_VOLUME_DIARIO]:
+            del volume[dia_antigo]
+    return volume[dia]
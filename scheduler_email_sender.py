@@ -1,12 +1,25 @@
+import argparse
+import csv
+import io
 import json
 import os
-from datetime import datetime
+import random
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import pytz # Importa a biblioteca para fusos horários
 from dotenv import load_dotenv # Importa para carregar .env localmente
 import subprocess # NOVO: Importa a biblioteca para executar comandos de sistema
+from status_agendador import STATUS_FILE, ler_status, salvar_status
+from canais_entrega import CanalEmail, CanalWebhook, enviar_por_canais
+from dados import carregar_json, incrementar_versao, salvar_json, versao_registro
+from estatisticas import (
+    ESTATISTICAS_AGENDADOR_FILE, carregar_estatisticas, estatisticas_vazias, salvar_estatisticas,
+    registrar_envio, registrar_falha, registrar_descarte
+)
 
 # --- Configurações Iniciais ---
 # Carrega variáveis do .env (necessário para execução local e debug)
@@ -18,26 +31,48 @@ FUSO_HORARIO_BRASIL = pytz.timezone('America/Sao_Paulo')
 # Caminhos dos arquivos (relativos ao diretório de execução)
 LEMBRETES_FILE = 'lembretes.json'
 CONFIG_FILE = 'config.json'
+COTA_FILE = 'cota_envio.json' # Contabilidade da cota diária de envios (persistida entre execuções)
 
 # Credenciais de e-mail (serão lidas das variáveis de ambiente ou .env)
 EMAIL_REMETENTE_USER = os.getenv("GMAIL_USER")
 EMAIL_REMETENTE_PASS = os.getenv("GMAIL_APP_PASSWORD")
 EMAIL_ADMIN_FALLBACK = os.getenv("EMAIL_ADMIN", EMAIL_REMETENTE_USER)
 
+# Limites de envio do provedor (o Gmail limita envios por minuto e por dia)
+LIMITE_ENVIOS_POR_MINUTO = int(os.getenv("LIMITE_ENVIOS_POR_MINUTO", "20"))
+LIMITE_ENVIOS_DIARIO = int(os.getenv("LIMITE_ENVIOS_DIARIO", "400"))
+# Tempo máximo que uma execução pode gastar enviando; o excedente fica para a próxima execução do cron (a cada 5 min)
+JANELA_EXECUCAO_SEGUNDOS = int(os.getenv("JANELA_EXECUCAO_SEGUNDOS", "240"))
+# Falhas seguidas indicam problema no provedor (autenticação, desconexão): paramos e deixamos o resto para depois
+MAX_FALHAS_CONSECUTIVAS = int(os.getenv("MAX_FALHAS_CONSECUTIVAS", "3"))
+
+# Modo de recuperação (após o Actions ficar sem rodar ou com credenciais vencidas)
+TAMANHO_LOTE_RECUPERACAO = int(os.getenv("TAMANHO_LOTE_RECUPERACAO", "25"))
+# O que fazer com lembretes atrasados há mais de LIMITE_ANTIGOS_HORAS: "enviar", "resumo" ou "descartar"
+POLITICA_LEMBRETES_ANTIGOS = os.getenv("POLITICA_LEMBRETES_ANTIGOS", "enviar")
+LIMITE_ANTIGOS_HORAS = float(os.getenv("LIMITE_ANTIGOS_HORAS", "24"))
+# A recuperação é disparada manualmente e pode rodar por mais tempo que a janela normal
+JANELA_RECUPERACAO_SEGUNDOS = int(os.getenv("JANELA_RECUPERACAO_SEGUNDOS", "3000"))
+
+# O status só é commitado quando muda, mas ao menos a cada intervalo para os health checks saberem que o scheduler está vivo
+INTERVALO_HEARTBEAT_SEGUNDOS = int(os.getenv("INTERVALO_HEARTBEAT_SEGUNDOS", "1200"))
+
+# Último erro de envio desta execução (vai para o status_agendador.json)
+ESTADO_ENVIO = {"ultimo_erro": None}
+
 # --- DEBUG PRINTS (ÚTEIS PARA RASTREAMENTO, REMOVA QUANDO ESTIVER TUDO OK) ---
 print("\n--- DEBUG INFORMATION (scheduler_email_sender.py) ---")
 print(f"DEBUG: Caminho LEMBRETES_FILE: '{os.path.abspath(LEMBRETES_FILE)}'")
 print(f"DEBUG: Caminho CONFIG_FILE: '{os.path.abspath(CONFIG_FILE)}'")
 print(f"DEBUG: Valor de GMAIL_USER: '{EMAIL_REMETENTE_USER}' (Configurado? {bool(EMAIL_REMETENTE_USER)})")
-print(f"DEBUG: Valor de GMAIL_APP_PASSWORD: '{EMAIL_REMETENTE_PASS[:5]}...' (Configurado? {bool(EMAIL_REMETENTE_PASS)})") # Oculta a maioria da senha por segurança
+print(f"DEBUG: Valor de GMAIL_APP_PASSWORD: '{(EMAIL_REMETENTE_PASS or '')[:5]}...' (Configurado? {bool(EMAIL_REMETENTE_PASS)})") # Oculta a maioria da senha por segurança
 print(f"DEBUG: Valor de EMAIL_ADMIN_FALLBACK: '{EMAIL_ADMIN_FALLBACK}' (Configurado? {bool(EMAIL_ADMIN_FALLBACK)})")
 
 # Tentativa de carregar config.json para debug adicional
 try:
-    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-        debug_config_data = json.load(f)
-        debug_email_destino_from_file = debug_config_data.get("email_destino")
-        print(f"DEBUG: email_destino no config.json: '{debug_email_destino_from_file}' (Configurado? {bool(debug_email_destino_from_file)})")
+    debug_config_data = carregar_json(CONFIG_FILE)
+    debug_email_destino_from_file = debug_config_data.get("email_destino")
+    print(f"DEBUG: email_destino no config.json: '{debug_email_destino_from_file}' (Configurado? {bool(debug_email_destino_from_file)})")
 except FileNotFoundError:
     print(f"DEBUG: Arquivo {CONFIG_FILE} não encontrado. Será usado o fallback.")
 except json.JSONDecodeError:
@@ -54,12 +89,11 @@ def carregar_lembretes():
         print(f"Aviso: O arquivo '{LEMBRETES_FILE}' não foi encontrado. Retornando lista vazia.")
         return []
     try:
-        with open(LEMBRETES_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if not isinstance(data, list): # Garante que o JSON é uma lista
-                print(f"Aviso: O arquivo '{LEMBRETES_FILE}' contém dados inválidos (não é uma lista). Retornando lista vazia.")
-                return []
-            return data
+        data = carregar_json(LEMBRETES_FILE)
+        if not isinstance(data, list): # Garante que o JSON é uma lista
+            print(f"Aviso: O arquivo '{LEMBRETES_FILE}' contém dados inválidos (não é uma lista). Retornando lista vazia.")
+            return []
+        return data
     except json.JSONDecodeError:
         print(f"Aviso: O arquivo '{LEMBRETES_FILE}' está vazio ou corrompido. Retornando lista vazia.")
         return []
@@ -68,12 +102,14 @@ def carregar_lembretes():
         return []
 
 # NOVA FUNÇÃO: Salva lembretes e faz commit/push
-def salvar_lembretes_e_commitar(lembretes_data, mensagem_commit):
-    """Salva os dados de lembretes no lembretes.json e faz commit/push para o GitHub."""
+def salvar_lembretes_e_commitar(lembretes_data, mensagem_commit, arquivos_extras=()):
+    """Salva os dados de lembretes no lembretes.json e faz commit/push para o GitHub.
+
+    `arquivos_extras` são arquivos já gravados em disco (ex.: cota_envio.json) que entram no mesmo commit.
+    """
     try:
         # Salva o arquivo localmente
-        with open(LEMBRETES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(lembretes_data, f, indent=4, ensure_ascii=False)
+        salvar_json(LEMBRETES_FILE, lembretes_data)
         print(f"DEBUG: Arquivo {LEMBRETES_FILE} salvo localmente no Actions.")
 
         # Configura as credenciais do Git
@@ -85,20 +121,10 @@ def salvar_lembretes_e_commitar(lembretes_data, mensagem_commit):
         subprocess.run(["git", "config", "user.name", "GitHub Actions Bot"], check=True)
         subprocess.run(["git", "config", "user.email", "actions@github.com"], check=True)
 
-        # NOVO: Antes de adicionar e commitar, PULL para integrar quaisquer mudanças remotas
-        try:
-            # Assumindo que a branch principal é 'main'. Se for 'master', mude aqui.
-            subprocess.run(["git", "pull", "--rebase", "origin", "main"], check=True)
-            print(f"DEBUG: Git pull bem-sucedido para {LEMBRETES_FILE}.")
-        except subprocess.CalledProcessError as e:
-            # Captura a saída de erro de forma segura
-            error_pull_output = e.stderr.decode('utf-8').strip() if e.stderr else (e.output.decode('utf-8').strip() if e.output else "Nenhuma saída de erro do git pull.")
-            print(f"DEBUG: Erro ao fazer git pull: {error_pull_output}. Pode haver conflitos ou o remoto tem novas alterações. Tentando prosseguir com o push.")
-            # Note: Depending on the severity of the conflict/error, you might want to exit here instead of proceeding.
-
-        # Adiciona o arquivo modificado
-        subprocess.run(["git", "add", LEMBRETES_FILE], check=True)
-        print(f"DEBUG: {LEMBRETES_FILE} adicionado ao staging do Git no Actions.")
+        # Adiciona o arquivo modificado (e os extras que existirem)
+        arquivos_para_commit = [LEMBRETES_FILE] + [a for a in arquivos_extras if os.path.exists(a)]
+        subprocess.run(["git", "add"] + arquivos_para_commit, check=True)
+        print(f"DEBUG: {', '.join(arquivos_para_commit)} adicionado(s) ao staging do Git no Actions.")
         
         # Verifica se há algo para commitar antes de tentar commitar
         try:
@@ -113,6 +139,18 @@ def salvar_lembretes_e_commitar(lembretes_data, mensagem_commit):
         subprocess.run(["git", "commit", "-m", mensagem_commit], check=True)
         print(f"DEBUG: Commit realizado no Actions com a mensagem: '{mensagem_commit}'.")
 
+        # Com o commit local feito (árvore limpa), PULL --rebase para integrar quaisquer mudanças remotas.
+        # Fazer o pull antes do commit falhava sempre, pois o lembretes.json já estava modificado.
+        try:
+            # Assumindo que a branch principal é 'main'. Se for 'master', mude aqui.
+            subprocess.run(["git", "pull", "--rebase", "origin", "main"], check=True)
+            print(f"DEBUG: Git pull bem-sucedido para {LEMBRETES_FILE}.")
+        except subprocess.CalledProcessError as e:
+            # Captura a saída de erro de forma segura
+            error_pull_output = e.stderr.decode('utf-8').strip() if e.stderr else (e.output.decode('utf-8').strip() if e.output else "Nenhuma saída de erro do git pull.")
+            print(f"DEBUG: Erro ao fazer git pull: {error_pull_output}. Pode haver conflitos ou o remoto tem novas alterações. Tentando prosseguir com o push.")
+            # Note: Depending on the severity of the conflict/error, you might want to exit here instead of proceeding.
+
         # Faz o push para o repositório remoto usando o token para autenticação
         repo_owner_repo = os.getenv("GITHUB_REPOSITORY") # Formato: "usuario/repositorio"
         if not repo_owner_repo:
@@ -134,17 +172,51 @@ def salvar_lembretes_e_commitar(lembretes_data, mensagem_commit):
         raise # Re-lança a exceção para que o script falhe
 
 
+# Campos do lembretes.json que o scheduler altera; o resto do arquivo é do app
+CAMPOS_DO_SCHEDULER = ("enviado", "descartado", "enviado_em_resumo")
+
+def fotografar_lembretes(lembretes):
+    """{id: campos do scheduler + versão}, base para saber o que esta execução mudou desde a última gravação."""
+    return {
+        lembrete.get("id"): {**{campo: lembrete.get(campo) for campo in CAMPOS_DO_SCHEDULER}, "versao": versao_registro(lembrete)}
+        for lembrete in lembretes
+    }
+
+def reaplicar_alteracoes(lembretes, base):
+    """Relê o lembretes.json do disco e reaplica só o que esta execução mudou em `lembretes` desde a `base`.
+
+    Depois de um commit, o pull --rebase pode ter trazido lembretes criados, editados ou removidos no app;
+    gravar a lista em memória desfaria essas mudanças. Lembretes removidos no app continuam removidos e a
+    versão de cada lembrete alterado sobe a partir da versão do disco.
+    """
+    alteracoes = {}
+    for lembrete in lembretes:
+        anterior = base.get(lembrete.get("id"))
+        if anterior is None:
+            continue
+        campos = {campo: lembrete.get(campo) for campo in CAMPOS_DO_SCHEDULER if lembrete.get(campo) != anterior[campo]}
+        if campos:
+            alteracoes[lembrete["id"]] = (campos, versao_registro(lembrete) - anterior["versao"])
+
+    em_disco = carregar_lembretes()
+    for registro in em_disco:
+        if registro.get("id") in alteracoes:
+            campos, incremento = alteracoes[registro["id"]]
+            registro.update(campos)
+            registro["versao"] = versao_registro(registro) + incremento
+    return em_disco
+
+
 def carregar_configuracoes():
     if not os.path.exists(CONFIG_FILE):
         print(f"Aviso: O arquivo '{CONFIG_FILE}' não existe. Retornando configurações padrão com fallback.")
         return {"email_destino": EMAIL_ADMIN_FALLBACK}
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            if "email_destino" not in config:
-                print(f"Aviso: 'email_destino' não encontrado em '{CONFIG_FILE}'. Usando fallback.")
-                config["email_destino"] = EMAIL_ADMIN_FALLBACK
-            return config
+        config = carregar_json(CONFIG_FILE)
+        if "email_destino" not in config:
+            print(f"Aviso: 'email_destino' não encontrado em '{CONFIG_FILE}'. Usando fallback.")
+            config["email_destino"] = EMAIL_ADMIN_FALLBACK
+        return config
     except json.JSONDecodeError:
         print(f"Aviso: O arquivo '{CONFIG_FILE}' está vazio ou corrompido. Retornando configurações padrão com fallback.")
         return {"email_destino": EMAIL_ADMIN_FALLBACK}
@@ -152,6 +224,291 @@ def carregar_configuracoes():
         print(f"Erro inesperado ao carregar '{CONFIG_FILE}': {e}. Retornando configurações padrão.")
         return {"email_destino": EMAIL_ADMIN_FALLBACK}
 
+# --- Controle de Taxa e Cota Diária de Envio ---
+def criar_limitador(envios_por_minuto, relogio=time.monotonic, dormir=time.sleep):
+    """Cria um token bucket: permite rajadas de até `envios_por_minuto` e repõe fichas continuamente nessa taxa."""
+    return {
+        "capacidade": float(envios_por_minuto),
+        "fichas": float(envios_por_minuto),
+        "taxa_por_segundo": envios_por_minuto / 60.0,
+        "ultima_reposicao": relogio(),
+        "relogio": relogio,
+        "dormir": dormir,
+        "tempo_espera_total": 0.0,
+    }
+
+def aguardar_ficha(limitador, prazo):
+    """Consome uma ficha, esperando pela reposição se preciso.
+
+    Retorna False (sem consumir) se o `prazo` (no relógio do limitador) já passou ou se a ficha só estaria
+    disponível depois dele. Com envios lentos o balde nunca esvazia, então o prazo é verificado mesmo com ficha.
+    """
+    agora = limitador["relogio"]()
+    if agora >= prazo:
+        return False
+    decorrido = agora - limitador["ultima_reposicao"]
+    limitador["fichas"] = min(limitador["capacidade"], limitador["fichas"] + decorrido * limitador["taxa_por_segundo"])
+    limitador["ultima_reposicao"] = agora
+
+    if limitador["fichas"] < 1:
+        espera = (1 - limitador["fichas"]) / limitador["taxa_por_segundo"]
+        if agora + espera > prazo:
+            return False
+        limitador["dormir"](espera)
+        limitador["tempo_espera_total"] += espera
+        limitador["fichas"] = 1.0
+        limitador["ultima_reposicao"] = agora + espera
+
+    limitador["fichas"] -= 1
+    return True
+
+def carregar_cota(hoje):
+    """Carrega a contagem de envios do dia. Num novo dia a contagem recomeça do zero."""
+    cota_vazia = {"data": hoje, "enviados": 0, "adiados_ultima_execucao": 0}
+    try:
+        cota = carregar_json(COTA_FILE)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return cota_vazia
+    if not isinstance(cota, dict) or cota.get("data") != hoje:
+        return cota_vazia
+    cota.setdefault("enviados", 0)
+    cota.setdefault("adiados_ultima_execucao", 0)
+    return cota
+
+def salvar_cota(cota):
+    salvar_json(COTA_FILE, cota)
+
+def selecionar_vencidos(lembretes, agora):
+    """Retorna [(data_hora, lembrete)] dos lembretes vencidos e não enviados, do mais atrasado para o mais recente."""
+    vencidos = []
+    for lembrete in lembretes:
+        try:
+            # Pega a data e hora do lembrete, garantindo que são strings
+            lembrete_data_str = str(lembrete.get('data', ''))
+            lembrete_hora_str = str(lembrete.get('hora', ''))
+
+            if not lembrete_data_str or not lembrete_hora_str:
+                print(f"Aviso: Lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}) tem data/hora inválida ou ausente. Ignorando.")
+                continue # Pula para o próximo lembrete
+
+            # Converte a string de data/hora em um objeto datetime e o localiza no fuso horário
+            data_hora_lembrete_naive = datetime.strptime(f"{lembrete_data_str} {lembrete_hora_str}", "%Y-%m-%d %H:%M")
+            data_hora_lembrete = FUSO_HORARIO_BRASIL.localize(data_hora_lembrete_naive)
+
+            # Verifica se o lembrete já passou ou está no momento de envio e ainda não foi enviado
+            if data_hora_lembrete <= agora and not lembrete.get('enviado', False):
+                vencidos.append((data_hora_lembrete, lembrete))
+            elif data_hora_lembrete > agora:
+                print(f"Lembrete futuro: '{lembrete['titulo']}' (ID: {lembrete['id']}) agendado para {lembrete['data']} às {lembrete['hora']}")
+            else: # Já foi enviado em uma execução anterior
+                print(f"Lembrete já enviado: '{lembrete['titulo']}' (ID: {lembrete['id']})")
+
+        except ValueError as e:
+            print(f"Erro no formato de data/hora do lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}): {e}. Lembrete ignorado.")
+        except Exception as e:
+            print(f"Erro inesperado ao processar lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}): {e}")
+
+    # Prioridade: quem venceu primeiro (maior atraso) é enviado primeiro
+    vencidos.sort(key=lambda item: item[0])
+    return vencidos
+
+def processar_envios(vencidos, enviar, limitador, cota, prazo, relogio_envio, estatisticas=None, limite_diario=LIMITE_ENVIOS_DIARIO):
+    """Envia os lembretes vencidos respeitando o token bucket, a cota diária e o prazo da execução.
+
+    `enviar(lembrete)` retorna True/False; `relogio_envio()` devolve o datetime atual (usado para medir o atraso).
+    Se `estatisticas` for informado, os contadores do painel admin são atualizados a cada envio/falha.
+    O que não couber nesta execução é adiado para a próxima. Retorna as métricas da execução.
+    """
+    metricas = {
+        "vencidos": len(vencidos),
+        "enviados": 0,
+        "falhas": 0,
+        "adiados": 0,
+        "motivo_adiamento": None,
+        "atraso_maximo_segundos": 0,
+        "atraso_total_segundos": 0,
+    }
+    falhas_consecutivas = 0
+
+    for posicao, (data_hora_lembrete, lembrete) in enumerate(vencidos):
+        if cota["enviados"] >= limite_diario:
+            metricas["motivo_adiamento"] = "cota diária esgotada"
+        elif falhas_consecutivas >= MAX_FALHAS_CONSECUTIVAS:
+            metricas["motivo_adiamento"] = f"{falhas_consecutivas} falhas consecutivas no envio"
+        elif limitador["relogio"]() >= prazo:
+            # Envios lentos (SMTP demorado) estouram a janela sem nunca esvaziar o balde
+            metricas["motivo_adiamento"] = "janela da execução esgotada"
+        elif not aguardar_ficha(limitador, prazo):
+            metricas["motivo_adiamento"] = "limite de envios por minuto dentro da janela da execução"
+
+        if metricas["motivo_adiamento"]:
+            metricas["adiados"] = len(vencidos) - posicao
+            break
+
+        print(f"Processando lembrete para envio: '{lembrete['titulo']}' (ID: {lembrete['id']})")
+        # A tentativa conta na cota do provedor mesmo quando falha
+        cota["enviados"] += 1
+        if enviar(lembrete):
+            lembrete['enviado'] = True # Marca como enviado
+            incrementar_versao(lembrete) # Edições abertas no app sobre este lembrete passam a dar conflito
+            metricas["enviados"] += 1
+            falhas_consecutivas = 0
+            momento_envio = relogio_envio()
+            atraso = max(0, int((momento_envio - data_hora_lembrete).total_seconds()))
+            metricas["atraso_total_segundos"] += atraso
+            metricas["atraso_maximo_segundos"] = max(metricas["atraso_maximo_segundos"], atraso)
+            if estatisticas is not None:
+                registrar_envio(estatisticas, lembrete, atraso, momento_envio.strftime('%Y-%m-%d'))
+        else:
+            metricas["falhas"] += 1
+            falhas_consecutivas += 1
+            if estatisticas is not None:
+                registrar_falha(estatisticas, lembrete, relogio_envio().strftime('%Y-%m-%d'))
+            print(f"Falha ao enviar lembrete: '{lembrete['titulo']}'. O status 'enviado' não será atualizado.")
+
+    cota["adiados_ultima_execucao"] = metricas["adiados"]
+    return metricas
+
+def atualizar_status(agora, pendentes, enviados, erro=None):
+    """Grava o status_agendador.json lido pelos health checks.
+
+    `pendentes` são os (data_hora, lembrete) vencidos que continuam sem envio. Retorna True quando o backlog
+    ou o erro mudou, ou quando o último status publicado já é mais velho que o intervalo de heartbeat; nesses
+    casos vale a pena incluir o arquivo num commit.
+    """
+    anterior = ler_status()
+    status = {
+        "ultima_execucao": agora.isoformat(),
+        "enviados_ultima_execucao": enviados,
+        "backlog_vencido": len(pendentes),
+        "atraso_mais_antigo_segundos": int((agora - min(dh for dh, _ in pendentes)).total_seconds()) if pendentes else 0,
+        "ultimo_erro_envio": anterior.get("ultimo_erro_envio"),
+        "ultimo_erro_em": anterior.get("ultimo_erro_em"),
+    }
+    if erro:
+        status["ultimo_erro_envio"] = erro
+        status["ultimo_erro_em"] = agora.isoformat()
+    salvar_status(status)
+
+    # O horário de um erro que se repete a cada execução (ex.: credenciais ausentes) vai no heartbeat, sem um commit por execução
+    campos_relevantes = ("backlog_vencido", "ultimo_erro_envio")
+    if any(anterior.get(campo) != status[campo] for campo in campos_relevantes):
+        return True
+    try:
+        idade_publicada = (agora - datetime.fromisoformat(anterior["ultima_execucao"])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return True
+    return idade_publicada >= INTERVALO_HEARTBEAT_SEGUNDOS
+
+def webhook_do_lembrete(config, lembrete):
+    """URL de webhook configurada para o dono do lembrete, ou a global do config.json."""
+    config_usuario = config.get(lembrete.get('user_id'), {})
+    if isinstance(config_usuario, dict) and config_usuario.get("webhook_url"):
+        return config_usuario["webhook_url"]
+    return config.get("webhook_url")
+
+def dividir_em_lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+def montar_email_resumo(lembretes):
+    assunto = f"⏰ Resumo: {len(lembretes)} lembrete(s) atrasado(s)"
+    linhas = [f"- {l['titulo']} ({l['data']} às {l['hora']}): {l['descricao']}" for l in lembretes]
+    corpo = (
+        "Olá!\n\nO envio de lembretes ficou parado por um tempo e estes lembretes venceram nesse período:\n\n"
+        + "\n".join(linhas)
+        + "\n\nNão se esqueça!"
+    )
+    return assunto, corpo
+
+def recuperar_atrasados(vencidos, agora, enviar, enviar_resumo, persistir, limitador, cota, prazo, relogio_envio,
+                        estatisticas, tamanho_lote, politica_antigos, limite_antigos_horas):
+    """Drena o backlog de lembretes vencidos em lotes, persistindo o progresso ao fim de cada lote.
+
+    Lembretes atrasados há mais de `limite_antigos_horas` seguem a `politica_antigos`: "enviar" (como os demais),
+    "resumo" (um e-mail por lote listando todos) ou "descartar" (marcados como enviados, sem envio).
+    `persistir(mensagem)` grava e commita o estado atual; se a execução for interrompida, a próxima recomeça
+    de onde a última persistência parou. Retorna as métricas consolidadas.
+    """
+    limite_antigos = agora - timedelta(hours=limite_antigos_horas)
+    antigos = [(dh, l) for dh, l in vencidos if dh < limite_antigos]
+    if politica_antigos == "enviar" or not antigos:
+        antigos, normais = [], vencidos
+    else:
+        normais = [(dh, l) for dh, l in vencidos if dh >= limite_antigos]
+
+    total = len(vencidos)
+    metricas = {"vencidos": total, "enviados": 0, "falhas": 0, "adiados": 0, "motivo_adiamento": None,
+                "atraso_maximo_segundos": 0, "atraso_total_segundos": 0, "em_resumo": 0, "descartados": 0}
+    print(f"Recuperação: {total} lembrete(s) vencido(s), {len(antigos)} com mais de {limite_antigos_horas:g}h "
+          f"(política: {politica_antigos}), lotes de {tamanho_lote}.")
+
+    def progresso():
+        return metricas["enviados"] + metricas["em_resumo"] + metricas["descartados"]
+
+    if antigos and politica_antigos == "descartar":
+        dia = relogio_envio().strftime('%Y-%m-%d')
+        for _, lembrete in antigos:
+            lembrete['enviado'] = True
+            lembrete['descartado'] = True
+            incrementar_versao(lembrete)
+            registrar_descarte(estatisticas, lembrete, dia)
+        metricas["descartados"] = len(antigos)
+        persistir(f"Scheduler (recuperação): {len(antigos)} lembrete(s) antigo(s) descartado(s).")
+        print(f"Recuperação: {len(antigos)} lembrete(s) antigo(s) descartado(s). Progresso {progresso()}/{total}.")
+
+    elif antigos and politica_antigos == "resumo":
+        lotes = list(dividir_em_lotes(antigos, tamanho_lote))
+        for numero, lote in enumerate(lotes, start=1):
+            if cota["enviados"] >= LIMITE_ENVIOS_DIARIO or not aguardar_ficha(limitador, prazo):
+                metricas["motivo_adiamento"] = "cota diária ou janela da execução esgotada"
+                metricas["adiados"] = sum(len(l) for l in lotes[numero - 1:]) + len(normais)
+                return metricas
+            cota["enviados"] += 1
+            if not enviar_resumo([l for _, l in lote]):
+                metricas["falhas"] += 1
+                metricas["motivo_adiamento"] = "falha ao enviar o resumo"
+                metricas["adiados"] = sum(len(l) for l in lotes[numero - 1:]) + len(normais)
+                return metricas
+            momento_envio = relogio_envio()
+            for data_hora_lembrete, lembrete in lote:
+                lembrete['enviado'] = True
+                lembrete['enviado_em_resumo'] = True
+                incrementar_versao(lembrete)
+                registrar_envio(estatisticas, lembrete, int((momento_envio - data_hora_lembrete).total_seconds()), momento_envio.strftime('%Y-%m-%d'))
+            metricas["em_resumo"] += len(lote)
+            persistir(f"Scheduler (recuperação): resumo {numero}/{len(lotes)} com {len(lote)} lembrete(s) antigo(s).")
+            print(f"Recuperação: resumo {numero}/{len(lotes)} enviado. Progresso {progresso()}/{total}.")
+
+    lotes = list(dividir_em_lotes(normais, tamanho_lote))
+    for numero, lote in enumerate(lotes, start=1):
+        metricas_lote = processar_envios(lote, enviar, limitador, cota, prazo, relogio_envio, estatisticas)
+        for chave in ("enviados", "falhas", "atraso_total_segundos"):
+            metricas[chave] += metricas_lote[chave]
+        metricas["atraso_maximo_segundos"] = max(metricas["atraso_maximo_segundos"], metricas_lote["atraso_maximo_segundos"])
+        if metricas_lote["enviados"]:
+            persistir(f"Scheduler (recuperação): lote {numero}/{len(lotes)}, {metricas_lote['enviados']} lembrete(s) enviado(s).")
+        print(f"Recuperação: lote {numero}/{len(lotes)}: {metricas_lote['enviados']} enviado(s), {metricas_lote['falhas']} falha(s). "
+              f"Progresso {progresso()}/{total}.")
+        if metricas_lote["motivo_adiamento"]:
+            metricas["motivo_adiamento"] = metricas_lote["motivo_adiamento"]
+            metricas["adiados"] = metricas_lote["adiados"] + sum(len(l) for l in lotes[numero:])
+            break
+
+    cota["adiados_ultima_execucao"] = metricas["adiados"]
+    return metricas
+
+def montar_email_lembrete(lembrete):
+    assunto = f"⏰ Lembrete: {lembrete['titulo']}"
+    corpo = (
+        f"Olá!\n\nVocê tem um lembrete pendente:\n\n"
+        f"Título: {lembrete['titulo']}\n"
+        f"Descrição: {lembrete['descricao']}\n"
+        f"Data: {lembrete['data']} às {lembrete['hora']}\n\n"
+        f"Não se esqueça!"
+    )
+    return assunto, corpo
+
 # --- Funções de Envio de E-mail ---
 def enviar_email(destinatario, assunto, corpo):
     if not EMAIL_REMETENTE_USER or not EMAIL_REMETENTE_PASS:
@@ -176,82 +533,315 @@ def enviar_email(destinatario, assunto, corpo):
         return True
     except smtplib.SMTPAuthenticationError as e:
         print(f"ERRO DE AUTENTICAÇÃO SMTP: Verifique GMAIL_USER e GMAIL_APP_PASSWORD (senha de aplicativo). Detalhes: {e}")
+        ESTADO_ENVIO["ultimo_erro"] = f"Autenticação SMTP: {e}"
         return False
     except smtplib.SMTPServerDisconnected as e:
         print(f"ERRO DE CONEXÃO SMTP: O servidor desconectou. Verifique sua rede ou configurações do Gmail. Detalhes: {e}")
+        ESTADO_ENVIO["ultimo_erro"] = f"Servidor SMTP desconectou: {e}"
         return False
     except Exception as e:
         print(f"Erro inesperado ao enviar e-mail para {destinatario}: {e}")
+        ESTADO_ENVIO["ultimo_erro"] = f"Erro inesperado: {e}"
         return False
 
 # --- Lógica Principal de Verificação e Envio ---
-def main():
-    print(f"[{datetime.now(FUSO_HORARIO_BRASIL).strftime('%Y-%m-%d %H:%M:%S')}] Iniciando verificação de lembretes...")
+def main(recuperacao=False, tamanho_lote=TAMANHO_LOTE_RECUPERACAO, politica_antigos=POLITICA_LEMBRETES_ANTIGOS,
+         limite_antigos_horas=LIMITE_ANTIGOS_HORAS):
+    print(f"[{datetime.now(FUSO_HORARIO_BRASIL).strftime('%Y-%m-%d %H:%M:%S')}] Iniciando verificação de lembretes{' (modo recuperação)' if recuperacao else ''}...")
     
     lembretes_atuais = carregar_lembretes() # Renomeado para evitar conflito
+    base_lembretes = fotografar_lembretes(lembretes_atuais)
+
+    def commitar_lembretes(mensagem_commit, arquivos_extras):
+        # Cada commit pode puxar mudanças do app: grava o disco atual + o que esta execução mudou desde o último commit
+        salvar_lembretes_e_commitar(reaplicar_alteracoes(lembretes_atuais, base_lembretes), mensagem_commit, arquivos_extras=arquivos_extras)
+        base_lembretes.update(fotografar_lembretes(lembretes_atuais))
+
     config = carregar_configuracoes()
     email_destino_lembretes = config.get("email_destino", EMAIL_ADMIN_FALLBACK)
+
+    # Obtém a hora atual com o fuso horário correto
+    agora = datetime.now(FUSO_HORARIO_BRASIL)
     
     if not email_destino_lembretes:
         print("Aviso: E-mail de destino não configurado no 'config.json' e nenhum fallback disponível. Não será possível enviar e-mails.")
+        # O status só chega ao ?ping e ao /health se for commitado (o disco do runner é descartado)
+        if atualizar_status(agora, selecionar_vencidos(lembretes_atuais, agora), 0, "E-mail de destino não configurado."):
+            commitar_lembretes("Scheduler: status atualizado.", [STATUS_FILE])
         return
     
     if not (EMAIL_REMETENTE_USER and EMAIL_REMETENTE_PASS):
         print("Aviso: Credenciais do remetente (GMAIL_USER e GMAIL_APP_PASSWORD) não configuradas. Não será possível enviar e-mails.")
+        if atualizar_status(agora, selecionar_vencidos(lembretes_atuais, agora), 0, "Credenciais do remetente não configuradas."):
+            commitar_lembretes("Scheduler: status atualizado.", [STATUS_FILE])
         return
 
-    # Obtém a hora atual com o fuso horário correto
-    agora = datetime.now(FUSO_HORARIO_BRASIL)
-    lembretes_enviados_nesta_execucao = 0
+    cota = carregar_cota(agora.strftime('%Y-%m-%d'))
+    # Contadores próprios do scheduler (o estatisticas.json é do app): o commit dele nunca conflita com o do app
+    estatisticas = carregar_estatisticas(ESTATISTICAS_AGENDADOR_FILE) or estatisticas_vazias()
+    limitador = criar_limitador(LIMITE_ENVIOS_POR_MINUTO)
+    prazo = time.monotonic() + (JANELA_RECUPERACAO_SEGUNDOS if recuperacao else JANELA_EXECUCAO_SEGUNDOS)
 
-    for lembrete in lembretes_atuais:
-        try:
-            # Pega a data e hora do lembrete, garantindo que são strings
-            lembrete_data_str = str(lembrete.get('data', ''))
-            lembrete_hora_str = str(lembrete.get('hora', ''))
+    vencidos = selecionar_vencidos(lembretes_atuais, agora)
 
-            if not lembrete_data_str or not lembrete_hora_str:
-                print(f"Aviso: Lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}) tem data/hora inválida ou ausente. Ignorando.")
-                continue # Pula para o próximo lembrete
+    def enviar(lembrete):
+        # E-mail e webhook (se configurado) saem em paralelo; basta um canal entregar para o lembrete contar como enviado
+        assunto, corpo = montar_email_lembrete(lembrete)
+        canais = [CanalEmail(enviar_email, email_destino_lembretes)]
+        url_webhook = webhook_do_lembrete(config, lembrete)
+        if url_webhook:
+            canais.append(CanalWebhook(url_webhook))
+        resultados = enviar_por_canais(canais, assunto, corpo, lembrete)
+        for canal in canais:
+            if not resultados[canal.nome]:
+                print(f"Aviso: canal {canal.nome} falhou para o lembrete '{lembrete['titulo']}'.")
+                if getattr(canal, "ultimo_erro", None):
+                    ESTADO_ENVIO["ultimo_erro"] = f"Webhook: {canal.ultimo_erro}"
+        return any(resultados.values())
+
+    if recuperacao:
+        def enviar_resumo(lembretes_do_resumo):
+            assunto, corpo = montar_email_resumo(lembretes_do_resumo)
+            return enviar_email(email_destino_lembretes, assunto, corpo)
+
+        def persistir(mensagem_commit):
+            salvar_cota(cota)
+            salvar_estatisticas(estatisticas, ESTATISTICAS_AGENDADOR_FILE)
+            commitar_lembretes(mensagem_commit, [COTA_FILE, ESTATISTICAS_AGENDADOR_FILE])
+
+        metricas = recuperar_atrasados(
+            vencidos, agora, enviar, enviar_resumo, persistir, limitador, cota, prazo,
+            lambda: datetime.now(FUSO_HORARIO_BRASIL), estatisticas, tamanho_lote, politica_antigos, limite_antigos_horas
+        )
+    else:
+        metricas = processar_envios(vencidos, enviar, limitador, cota, prazo, lambda: datetime.now(FUSO_HORARIO_BRASIL), estatisticas)
+    lembretes_enviados_nesta_execucao = metricas["enviados"]
+
+    # Métricas de contrapressão: quanto ficou represado e por quê
+    atraso_medio = metricas["atraso_total_segundos"] // metricas["enviados"] if metricas["enviados"] else 0
+    print(
+        f"Métricas: {metricas['vencidos']} vencido(s), {metricas['enviados']} enviado(s), {metricas['falhas']} falha(s), "
+        f"{metricas['adiados']} adiado(s). Atraso médio {atraso_medio}s, máximo {metricas['atraso_maximo_segundos']}s. "
+        f"Espera no limitador: {limitador['tempo_espera_total']:.1f}s. Cota diária: {cota['enviados']}/{LIMITE_ENVIOS_DIARIO}."
+    )
+    if metricas["adiados"]:
+        print(f"Aviso: {metricas['adiados']} lembrete(s) adiado(s) para a próxima execução ({metricas['motivo_adiamento']}).")
+
+    pendentes = [(dh, l) for dh, l in vencidos if not l.get('enviado', False)]
+    status_mudou = atualizar_status(datetime.now(FUSO_HORARIO_BRASIL), pendentes, lembretes_enviados_nesta_execucao, ESTADO_ENVIO["ultimo_erro"])
 
-            # Converte a string de data/hora em um objeto datetime e o localiza no fuso horário
-            data_hora_lembrete_naive = datetime.strptime(f"{lembrete_data_str} {lembrete_hora_str}", "%Y-%m-%d %H:%M")
-            data_hora_lembrete = FUSO_HORARIO_BRASIL.localize(data_hora_lembrete_naive)
-            
-            # Verifica se o lembrete já passou ou está no momento de envio e ainda não foi enviado
-            if data_hora_lembrete <= agora and not lembrete.get('enviado', False):
-                assunto = f"⏰ Lembrete: {lembrete['titulo']}"
-                corpo = (
-                    f"Olá!\n\nVocê tem um lembrete pendente:\n\n"
-                    f"Título: {lembrete['titulo']}\n"
-                    f"Descrição: {lembrete['descricao']}\n"
-                    f"Data: {lembrete['data']} às {lembrete['hora']}\n\n"
-                    f"Não se esqueça!"
-                )
-                
-                print(f"Processando lembrete para envio: '{lembrete['titulo']}' (ID: {lembrete['id']})")
-                if enviar_email(email_destino_lembretes, assunto, corpo):
-                    lembrete['enviado'] = True # Marca como enviado
-                    lembretes_enviados_nesta_execucao += 1
-                else:
-                    print(f"Falha ao enviar lembrete: '{lembrete['titulo']}'. O status 'enviado' não será atualizado.")
-            elif data_hora_lembrete > agora:
-                print(f"Lembrete futuro: '{lembrete['titulo']}' (ID: {lembrete['id']}) agendado para {lembrete['data']} às {lembrete['hora']}")
-            else: # Já foi enviado em uma execução anterior
-                print(f"Lembrete já enviado: '{lembrete['titulo']}' (ID: {lembrete['id']})")
-        
-        except ValueError as e:
-            print(f"Erro no formato de data/hora do lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}): {e}. Lembrete ignorado.")
-        except Exception as e:
-            print(f"Erro inesperado ao processar lembrete '{lembrete.get('titulo', 'N/A')}' (ID: {lembrete.get('id', 'N/A')}): {e}")
-            
     # Salva o arquivo de lembretes APENAS se houver alteração (ou seja, se algum e-mail foi enviado)
+    houve_tentativas = metricas["enviados"] or metricas["falhas"]
+    if houve_tentativas:
+        salvar_estatisticas(estatisticas, ESTATISTICAS_AGENDADOR_FILE)
+        # Tentativas que falharam também contam na cota do provedor
+        salvar_cota(cota)
     if lembretes_enviados_nesta_execucao > 0:
-        salvar_lembretes_e_commitar(lembretes_atuais, f"Scheduler: Lembretes enviados ({lembretes_enviados_nesta_execucao}) atualizados.")
+        commitar_lembretes(f"Scheduler: Lembretes enviados ({lembretes_enviados_nesta_execucao}) atualizados.", [COTA_FILE, STATUS_FILE, ESTATISTICAS_AGENDADOR_FILE])
+    elif status_mudou or houve_tentativas:
+        # Nada enviado, mas houve falhas, o backlog/erro mudou ou é hora do heartbeat: publica o status e a cota
+        commitar_lembretes("Scheduler: status atualizado.", [COTA_FILE, STATUS_FILE, ESTATISTICAS_AGENDADOR_FILE])
     else:
         print("Nenhum lembrete novo para enviar ou alterar status.")
         
     print(f"[{datetime.now(FUSO_HORARIO_BRASIL).strftime('%Y-%m-%d %H:%M:%S')}] Verificação concluída. {lembretes_enviados_nesta_execucao} lembrete(s) enviado(s) nesta execução.")
 
+# --- Simulação (planejamento de capacidade) ---
+def gerar_lembretes_sinteticos(quantidade, inicio, fim, horario_pico=None, fracao_pico=0.0, semente=0):
+    """Lembretes espalhados uniformemente entre `inicio` e `fim`; uma `fracao_pico` deles cai no `horario_pico` ('HH:MM') de cada dia."""
+    aleatorio = random.Random(semente)
+    minutos = int((fim - inicio).total_seconds() // 60)
+    picos = []
+    if horario_pico:
+        hora_pico = datetime.strptime(horario_pico, '%H:%M').time()
+        dia = inicio.date()
+        while dia <= fim.date():
+            momento_pico = FUSO_HORARIO_BRASIL.localize(datetime.combine(dia, hora_pico))
+            if inicio <= momento_pico <= fim:
+                picos.append(momento_pico)
+            dia += timedelta(days=1)
+
+    lembretes = []
+    for i in range(quantidade):
+        if picos and aleatorio.random() < fracao_pico:
+            data_hora = aleatorio.choice(picos)
+        else:
+            data_hora = inicio + timedelta(minutes=aleatorio.randint(0, minutos))
+        lembretes.append({
+            "id": f"simulado-{i}",
+            "user_id": "simulacao",
+            "titulo": f"Lembrete simulado {i}",
+            "descricao": "",
+            "data": data_hora.strftime('%Y-%m-%d'),
+            "hora": data_hora.strftime('%H:%M'),
+            "enviado": False,
+        })
+    return lembretes
+
+def simular(lembretes, inicio, fim, passo_minutos=5, latencia_smtp=1.0, variacao_latencia=0.0, conexoes_smtp=1,
+            taxa_falhas=0.0, envios_por_minuto=LIMITE_ENVIOS_POR_MINUTO, limite_diario=LIMITE_ENVIOS_DIARIO,
+            janela_segundos=JANELA_EXECUCAO_SEGUNDOS, sobrecarga_segundos=0.0, semente=0):
+    """Roda a lógica do `main` (seleção dos vencidos, token bucket, cota diária, janela da execução) num relógio virtual.
+
+    Nada é enviado nem gravado: o transporte só consome o tempo simulado de uma das `conexoes_smtp`. As execuções
+    do cron seguem a concurrency do workflow (uma por vez; as que caem durante outra viram uma só, ao final dela) e
+    cada uma parte do estado deixado pela anterior, como no workflow, cujo checkout pega a ponta da branch padrão.
+    Retorna (execucoes, atrasos): métricas por execução e o atraso, em segundos, de cada lembrete enviado.
+    """
+    aleatorio = random.Random(semente)
+    relogio = {"segundos": 0.0} # Segundos virtuais desde `inicio`
+    conexoes = [0.0] * conexoes_smtp # Quando cada conexão SMTP fica livre
+    ultima_conclusao = {"segundos": 0.0}
+    atrasos = []
+
+    def momento(segundos):
+        return inicio + timedelta(seconds=segundos)
+
+    def dormir(segundos):
+        relogio["segundos"] += segundos
+
+    with redirect_stdout(io.StringIO()):
+        fila = selecionar_vencidos(lembretes, fim)
+    horario_do_lembrete = {id(lembrete): data_hora for data_hora, lembrete in fila}
+
+    def enviar(lembrete):
+        # O envio começa quando houver conexão livre e termina `latencia` segundos depois
+        conexao = min(range(conexoes_smtp), key=conexoes.__getitem__)
+        relogio["segundos"] = max(relogio["segundos"], conexoes[conexao])
+        latencia = max(0.0, latencia_smtp + aleatorio.uniform(-variacao_latencia, variacao_latencia))
+        conexoes[conexao] = ultima_conclusao["segundos"] = relogio["segundos"] + latencia
+        if aleatorio.random() < taxa_falhas:
+            return False
+        atrasos.append(max(0.0, (momento(conexoes[conexao]) - horario_do_lembrete[id(lembrete)]).total_seconds()))
+        return True
+
+    execucoes = []
+    cota = None
+    posicao = 0
+    pendentes = []
+    agendado = 0.0
+    fim_anterior = 0.0
+    duracao_total = (fim - inicio).total_seconds()
+    while agendado <= duracao_total:
+        inicio_execucao = max(agendado, fim_anterior)
+        relogio["segundos"] = inicio_execucao + sobrecarga_segundos # Checkout, instalação e leitura dos arquivos
+        agora = momento(relogio["segundos"])
+        if cota is None or cota["data"] != agora.strftime('%Y-%m-%d'):
+            cota = {"data": agora.strftime('%Y-%m-%d'), "enviados": 0, "adiados_ultima_execucao": 0}
+        while posicao < len(fila) and fila[posicao][0] <= agora:
+            pendentes.append(fila[posicao])
+            posicao += 1
+
+        limitador = criar_limitador(envios_por_minuto, relogio=lambda: relogio["segundos"], dormir=dormir)
+        with redirect_stdout(io.StringIO()):
+            metricas = processar_envios(pendentes, enviar, limitador, cota, relogio["segundos"] + janela_segundos,
+                                        lambda: momento(ultima_conclusao["segundos"]), limite_diario=limite_diario)
+        pendentes = [(data_hora, lembrete) for data_hora, lembrete in pendentes if not lembrete.get('enviado', False)]
+
+        fim_anterior = max([relogio["segundos"]] + conexoes)
+        execucoes.append({
+            "horario": momento(inicio_execucao).strftime('%Y-%m-%d %H:%M'),
+            "vencidos": metricas["vencidos"],
+            "enviados": metricas["enviados"],
+            "falhas": metricas["falhas"],
+            "adiados": metricas["adiados"],
+            "motivo_adiamento": metricas["motivo_adiamento"] or "",
+            "duracao_segundos": round(fim_anterior - inicio_execucao, 1),
+            "espera_limitador_segundos": round(limitador["tempo_espera_total"], 1),
+            "atraso_maximo_segundos": metricas["atraso_maximo_segundos"],
+            "cota_usada": cota["enviados"],
+            "pendentes_ao_final": len(pendentes),
+        })
+
+        agendado += passo_minutos * 60
+        while agendado + passo_minutos * 60 <= fim_anterior:
+            agendado += passo_minutos * 60
+    return execucoes, atrasos
+
+def imprimir_simulacao(execucoes, atrasos, limite_diario, janela_segundos):
+    print(f"{'execução':<17}{'vencidos':>9}{'enviados':>9}{'adiados':>8}{'duração (s)':>12}{'atraso máx (s)':>15}  motivo do adiamento")
+    for execucao in execucoes:
+        if execucao["vencidos"]:
+            print(f"{execucao['horario']:<17}{execucao['vencidos']:>9}{execucao['enviados']:>9}{execucao['adiados']:>8}"
+                  f"{execucao['duracao_segundos']:>12}{execucao['atraso_maximo_segundos']:>15}  {execucao['motivo_adiamento']}")
+
+    print("\n--- Resumo da simulação ---")
+    enviados = sum(execucao["enviados"] for execucao in execucoes)
+    print(f"Execuções simuladas: {len(execucoes)} ({sum(1 for e in execucoes if e['vencidos'])} com lembretes vencidos).")
+    print(f"Lembretes enviados: {enviados}. Ainda pendentes ao fim do período: {execucoes[-1]['pendentes_ao_final'] if execucoes else 0}.")
+    if atrasos:
+        ordenados = sorted(atrasos)
+        p95 = ordenados[int(0.95 * (len(ordenados) - 1))]
+        print(f"Atraso projetado: médio {sum(ordenados) / len(ordenados):.0f}s, p95 {p95:.0f}s, máximo {ordenados[-1]:.0f}s.")
+    if execucoes:
+        pico = max(execucoes, key=lambda e: (e["vencidos"], e["duracao_segundos"]))
+        print(f"Pico: {pico['horario']} com {pico['vencidos']} vencido(s), execução de {pico['duracao_segundos']}s (janela {janela_segundos}s).")
+        dias_cota = sorted({e["horario"][:10] for e in execucoes if e["cota_usada"] >= limite_diario})
+        if dias_cota:
+            print(f"Cota diária ({limite_diario}) esgotada em: {', '.join(dias_cota)}.")
+
+def executar_simulacao(args):
+    inicio = FUSO_HORARIO_BRASIL.localize(datetime.strptime(args.inicio, '%Y-%m-%d %H:%M')) if args.inicio else \
+        FUSO_HORARIO_BRASIL.localize(datetime.combine(datetime.now(FUSO_HORARIO_BRASIL).date() + timedelta(days=1), datetime.min.time()))
+    fim = FUSO_HORARIO_BRASIL.localize(datetime.strptime(args.fim, '%Y-%m-%d %H:%M')) if args.fim else inicio + timedelta(days=1)
+    if args.sinteticos:
+        lembretes = gerar_lembretes_sinteticos(args.sinteticos, inicio, fim, args.horario_pico, args.fracao_pico, args.semente)
+    else:
+        lembretes = carregar_lembretes()
+    print(f"Simulando {len(lembretes)} lembrete(s) de {inicio.strftime('%Y-%m-%d %H:%M')} a {fim.strftime('%Y-%m-%d %H:%M')} "
+          f"(cron a cada {args.passo_minutos} min, {args.limite_por_minuto}/min, {args.limite_diario}/dia, "
+          f"SMTP {args.latencia_smtp}s ± {args.variacao_latencia}s em {args.conexoes_smtp} conexão(ões)).\n")
+
+    execucoes, atrasos = simular(
+        lembretes, inicio, fim, passo_minutos=args.passo_minutos, latencia_smtp=args.latencia_smtp,
+        variacao_latencia=args.variacao_latencia, conexoes_smtp=args.conexoes_smtp, taxa_falhas=args.taxa_falhas,
+        envios_por_minuto=args.limite_por_minuto, limite_diario=args.limite_diario, janela_segundos=args.janela_segundos,
+        sobrecarga_segundos=args.sobrecarga_segundos, semente=args.semente,
+    )
+    imprimir_simulacao(execucoes, atrasos, args.limite_diario, args.janela_segundos)
+    if args.csv and execucoes:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=list(execucoes[0]))
+            escritor.writeheader()
+            escritor.writerows(execucoes)
+        print(f"Métricas por execução gravadas em {args.csv}.")
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Envia os lembretes vencidos por e-mail (e webhook, se configurado).")
+    parser.add_argument("--recuperacao", action="store_true",
+                        help="Drena o backlog de lembretes atrasados em lotes, commitando o progresso a cada lote.")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_RECUPERACAO)
+    parser.add_argument("--politica-antigos", choices=["enviar", "resumo", "descartar"], default=POLITICA_LEMBRETES_ANTIGOS,
+                        help="O que fazer, na recuperação, com lembretes atrasados além de --limite-antigos-horas.")
+    parser.add_argument("--limite-antigos-horas", type=float, default=LIMITE_ANTIGOS_HORAS)
+
+    simulacao = parser.add_argument_group("simulação", "Projeta um período no relógio virtual, sem enviar nem gravar nada.")
+    simulacao.add_argument("--simular", action="store_true")
+    simulacao.add_argument("--inicio", help="'AAAA-MM-DD HH:MM' (padrão: amanhã 00:00).")
+    simulacao.add_argument("--fim", help="'AAAA-MM-DD HH:MM' (padrão: 24h após o início).")
+    simulacao.add_argument("--passo-minutos", type=int, default=5, help="Intervalo do cron.")
+    simulacao.add_argument("--sinteticos", type=int, default=0,
+                           help="Gera N lembretes no período em vez de usar o lembretes.json.")
+    simulacao.add_argument("--horario-pico", default="08:00", help="'HH:MM' que concentra parte dos sintéticos.")
+    simulacao.add_argument("--fracao-pico", type=float, default=0.3)
+    simulacao.add_argument("--latencia-smtp", type=float, default=1.0, help="Segundos por envio.")
+    simulacao.add_argument("--variacao-latencia", type=float, default=0.0, help="Variação uniforme (±) da latência.")
+    simulacao.add_argument("--conexoes-smtp", type=int, default=1, help="Envios simultâneos.")
+    simulacao.add_argument("--taxa-falhas", type=float, default=0.0)
+    simulacao.add_argument("--limite-por-minuto", type=int, default=LIMITE_ENVIOS_POR_MINUTO)
+    simulacao.add_argument("--limite-diario", type=int, default=LIMITE_ENVIOS_DIARIO)
+    simulacao.add_argument("--janela-segundos", type=int, default=JANELA_EXECUCAO_SEGUNDOS)
+    simulacao.add_argument("--sobrecarga-segundos", type=float, default=0.0,
+                           help="Tempo de cada execução antes dos envios (checkout, setup do Actions).")
+    simulacao.add_argument("--semente", type=int, default=0)
+    simulacao.add_argument("--csv", help="Grava as métricas de cada execução neste arquivo.")
+    args = parser.parse_args()
+    if args.simular:
+        executar_simulacao(args)
+        raise SystemExit(0)
+    main(
+        recuperacao=args.recuperacao or os.getenv("MODO_RECUPERACAO") == "1",
+        tamanho_lote=args.tamanho_lote,
+        politica_antigos=args.politica_antigos,
+        limite_antigos_horas=args.limite_antigos_horas,
+    )
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Status do scheduler para health checks.
+
+O scheduler_email_sender.py grava o status_agendador.json a cada execução; este
+módulo só lê esse arquivo, sem importar pandas, bcrypt, requests ou o app
+inteiro. Pode ser usado pelo `?ping` do app ou como servidor HTTP próprio:
+
+    python status_agendador.py --porta 8502    # GET /health devolve o status em JSON
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dados import carregar_json, salvar_json
+
+STATUS_FILE = 'status_agendador.json'
+# O cron roda a cada 5 minutos; sem execução registrada por mais que isso o scheduler é considerado parado
+LIMITE_SEM_EXECUCAO_SEGUNDOS = int(os.getenv("LIMITE_SEM_EXECUCAO_SEGUNDOS", "1800"))
+
+
+def ler_status():
+    try:
+        status = carregar_json(STATUS_FILE)
+        return status if isinstance(status, dict) else {}
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+
+def salvar_status(status):
+    salvar_json(STATUS_FILE, status)
+
+
+def resumo_status(agora=None):
+    """Status atual com a idade da última execução e o veredito "ok" / "atrasado" / "sem_dados"."""
+    agora = agora or datetime.now(timezone.utc)
+    status = ler_status()
+    resumo = {
+        "estado": "sem_dados",
+        "ultima_execucao": status.get("ultima_execucao"),
+        "segundos_desde_ultima_execucao": None,
+        "backlog_vencido": status.get("backlog_vencido", 0),
+        "atraso_mais_antigo_segundos": status.get("atraso_mais_antigo_segundos", 0),
+        "ultimo_erro_envio": status.get("ultimo_erro_envio"),
+        "ultimo_erro_em": status.get("ultimo_erro_em"),
+    }
+    if not resumo["ultima_execucao"]:
+        return resumo
+    try:
+        idade = (agora - datetime.fromisoformat(resumo["ultima_execucao"])).total_seconds()
+    except (TypeError, ValueError):
+        return resumo
+    resumo["segundos_desde_ultima_execucao"] = int(idade)
+    resumo["estado"] = "ok" if idade <= LIMITE_SEM_EXECUCAO_SEGUNDOS else "atrasado"
+    return resumo
+
+
+class _HandlerStatus(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/health', '/status'):
+            self.send_error(404)
+            return
+        resumo = resumo_status()
+        corpo = json.dumps(resumo, ensure_ascii=False).encode('utf-8')
+        self.send_response(200 if resumo["estado"] == "ok" else 503)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass # Pingers chamam com frequência; não polui o log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP mínimo com o status do scheduler de lembretes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--porta", type=int, default=int(os.getenv("PORTA_STATUS", "8502")))
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer((args.host, args.porta), _HandlerStatus)
+    print(f"Status do scheduler disponível em http://{args.host}:{args.porta}/health")
+    servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    main()